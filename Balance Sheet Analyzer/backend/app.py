@@ -230,8 +230,26 @@ def generate_dynamic_system_prompt(company_id):
             
         except Exception as e:
             file_contents += f"\n=== File: {filename} ===\nError reading file: {str(e)}\n"
-    
-    
+
+    # Tables precomputed by the augmentation scripts: DuPont, Altman Z', growth and
+    # funding metrics, and trailing-twelve-month / quarter-over-quarter results
+    precomputed = [
+        ('derived_metrics.csv', "Derived metrics (precomputed)"),
+        ('ttm_metrics.csv', "Trailing twelve months and quarter-over-quarter results (precomputed)"),
+    ]
+    for filename, title in precomputed:
+        derived_path = f'company_data/{company_id}/plots/{filename}'
+        if not os.path.exists(derived_path):
+            continue
+        try:
+            df = pd.read_csv(derived_path)
+            file_contents += f"{title}:\n"
+            file_contents += df.to_string(index=False)
+            file_contents += "\n"
+        except Exception as e:
+            file_contents += f"\n=== File: {filename} ===\nError reading file: {str(e)}\n"
+
+
     full_prompt = system_prompt + "\n" + file_contents
     
     return full_prompt
@@ -455,6 +473,12 @@ def get_plot_data(plot_name):
     company_id = user[0]
     file_path = f'company_data/{company_id}/plots/{plot_name}.csv'
     
+    # The augmentation scripts write the ready-to-render payload next to the CSV
+    dataset_path = f'company_data/{company_id}/plots/{plot_name}.json'
+    if os.path.exists(dataset_path):
+        with open(dataset_path, 'rb') as f:
+            return app.response_class(f.read(), mimetype='application/json')
+    
     # If plot file doesn't exist, return empty data (frontend will use dummy data)
     if not os.path.exists(file_path):
         return jsonify({
@@ -23,6 +23,9 @@ const DashboardPlots = () => {
     leverage: true
   });
   const [errors, setErrors] = useState({});
+  // Series order of plots the backend already bucketed into "Other"
+  const [bucketedKeys, setBucketedKeys] = useState({});
+  const [templateKeys, setTemplateKeys] = useState({});
 
   // Color palettes for consistent styling
   const colorPalette = {
@@ -101,6 +104,12 @@ const DashboardPlots = () => {
       const response = await axios.get(`http://localhost:5000/api/user/plot/${plotName}`);
       
       if (response.data && Array.isArray(response.data.data)) {
+        // Raw CSV responses are not bucketed, so a previous response's keys must not carry over
+        const isBucketed = response.data.bucketed && Array.isArray(response.data.keys);
+        setBucketedKeys(prev => ({ ...prev, [plotName]: isBucketed ? response.data.keys : null }));
+        // Plots extracted with an industry template carry its name and their own series
+        const hasTemplate = response.data.template && Array.isArray(response.data.keys);
+        setTemplateKeys(prev => ({ ...prev, [plotName]: hasTemplate ? response.data.keys : null }));
         return response.data.data;
       } else {
         throw new Error('Invalid data format');
@@ -108,6 +117,8 @@ const DashboardPlots = () => {
     } catch (error) {
       console.warn(`Failed to fetch ${plotName} data, using dummy data:`, error);
       setErrors(prev => ({ ...prev, [plotName]: 'Using sample data' }));
+      setBucketedKeys(prev => ({ ...prev, [plotName]: null }));
+      setTemplateKeys(prev => ({ ...prev, [plotName]: null }));
       return generateDummyData(plotName);
     }
   };
@@ -241,6 +252,26 @@ const DashboardPlots = () => {
     return Object.keys(sample).filter(key => !excludeKeys.includes(key));
   };
 
+  // Banks, NBFCs and insurers are extracted with industry templates whose series differ from the default
+  // plots; returns the template plot's keys, or null for a default plot
+  const getTemplateKeys = (plotName) => templateKeys[plotName] || null;
+
+  // Line chart of whatever series a template plot holds
+  const renderTemplateLines = (data, keys, formatter) => (
+    <ResponsiveContainer width="100%" height={300}>
+      <LineChart data={data} margin={{ top: 20, right: 30, left: 20, bottom: 5 }}>
+        <CartesianGrid strokeDasharray="3 3" />
+        <XAxis dataKey="period" />
+        <YAxis />
+        <Tooltip formatter={formatter} />
+        <Legend />
+        {keys.map((key, index) => (
+          <Line key={key} type="monotone" dataKey={key} stroke={colorPalette.primary[index % colorPalette.primary.length]} strokeWidth={2} name={key} />
+        ))}
+      </LineChart>
+    </ResponsiveContainer>
+  );
+
   // Format currency values in tooltips
   const formatCurrency = (value) => {
     if (typeof value !== 'number') return value;
@@ -290,6 +321,24 @@ const DashboardPlots = () => {
   // Plot 1: Stacked bar chart for assets and liabilities
   const renderAssetsLiabilitiesChart = () => {
     const data = plotData.assetsLiabilities || [];
+    const seriesKeys = getTemplateKeys('01_plot_AandL');
+
+    if (seriesKeys) {
+      return (
+        <ResponsiveContainer width="100%" height={300}>
+          <BarChart data={data} margin={{ top: 20, right: 30, left: 20, bottom: 5 }}>
+            <CartesianGrid strokeDasharray="3 3" />
+            <XAxis dataKey="period" />
+            <YAxis />
+            <Tooltip formatter={formatCurrency} />
+            <Legend />
+            {seriesKeys.map((key, index) => (
+              <Bar key={key} dataKey={key} fill={colorPalette.primary[index % colorPalette.primary.length]} name={key} />
+            ))}
+          </BarChart>
+        </ResponsiveContainer>
+      );
+    }
     
     return (
       <ResponsiveContainer width="100%" height={300}>
@@ -311,6 +360,11 @@ const DashboardPlots = () => {
   // Plot 2: Trend line chart for profitability
   const renderProfitabilityChart = () => {
     const data = plotData.profitability || [];
+    const seriesKeys = getTemplateKeys('02_plot_revPL');
+
+    if (seriesKeys) {
+      return renderTemplateLines(data, seriesKeys, formatCurrency);
+    }
     
     return (
       <ResponsiveContainer width="100%" height={300}>
@@ -333,8 +387,10 @@ const DashboardPlots = () => {
     const data = plotData.expenses || [];
     const expenseKeys = getDynamicKeys(data, ['period']);
     
-    // Filter out small expense categories and group them into "Other"
-    const { filteredData, filteredKeys } = filterSmallCategories(data, expenseKeys, 5);
+    // Filter out small expense categories and group them into "Other", unless the server already did
+    const { filteredData, filteredKeys } = bucketedKeys['03_plot_expenses']
+      ? { filteredData: data, filteredKeys: bucketedKeys['03_plot_expenses'] }
+      : filterSmallCategories(data, expenseKeys, 5);
     
     return (
       <ResponsiveContainer width="100%" height={300}>
@@ -365,8 +421,10 @@ const DashboardPlots = () => {
     const data = plotData.cashFlow || [];
     const cashFlowKeys = getDynamicKeys(data, ['period']);
     
-    // Filter out small cash flow categories and group them into "Other"
-    const { filteredData, filteredKeys } = filterSmallCategories(data, cashFlowKeys, 5);
+    // Filter out small cash flow categories and group them into "Other", unless the server already did
+    const { filteredData, filteredKeys } = bucketedKeys['04_plot_cashflow']
+      ? { filteredData: data, filteredKeys: bucketedKeys['04_plot_cashflow'] }
+      : filterSmallCategories(data, cashFlowKeys, 5);
     
     return (
       <ResponsiveContainer width="100%" height={300}>
@@ -395,6 +453,11 @@ const DashboardPlots = () => {
   // Plot 5: Trend line of margin ratios
   const renderMarginsChart = () => {
     const data = plotData.margins || [];
+    const seriesKeys = getTemplateKeys('05_plot_margins');
+
+    if (seriesKeys) {
+      return renderTemplateLines(data, seriesKeys, formatPercentage);
+    }
     
     return (
       <ResponsiveContainer width="100%" height={300}>
@@ -417,6 +480,11 @@ const DashboardPlots = () => {
   // Plot 6: Trend line of leverage metrics
   const renderLeverageChart = () => {
     const data = plotData.leverage || [];
+    const seriesKeys = getTemplateKeys('06_plot_leverage');
+
+    if (seriesKeys) {
+      return renderTemplateLines(data, seriesKeys, undefined);
+    }
     
     return (
       <ResponsiveContainer width="100%" height={300}>
@@ -0,0 +1,461 @@
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import pandas as pd
+import label_matching
+from label_matching import get_label_cache, use_label_cache
+from batch_cli import StageTimer, build_parser, company_patterns, matches_company, resolve_root, write_summary
+from derived_metrics import extract_derived_metrics, write_universe_table
+from financials_store import STORE_FORMATS, build_store
+from industry_templates import sector_template, template_extractor, untemplated_financial_sectors
+from manifest import code_version, file_fingerprint, is_up_to_date, load_manifest, save_manifest
+from plot_datasets import dataset_name, write_plot_dataset
+from pipeline_logging import install_queue_handler, start_logging
+from trailing_metrics import TTM_METRICS_FILE, extract_trailing_metrics
+from screening import SCREENING_DIR, TENSOR_OUTPUTS, build_tensor
+from sector_stats import RATIO_OUTPUTS, SECTOR_STATS_DB, build_sector_stats, find_sector_source, folder_key, load_sector_map, sector_files
+from statement_io import read_statement, write_plot_csv
+from validation import COMPANY_ISSUES_FILE, VALIDATION_REPORT, statements_frame, validate, write_company_issues
+from watch_mode import DEFAULT_POLL_INTERVAL, DEFAULT_SETTLE, watch
+from periods import extract_period_axis, statement_type
+from plot01_gen import extract_assets_liabilities
+from plot02_gen import extract_revenue_profit
+from plot03_gen import extract_expenses
+from plot04_gen import extract_cash_flow
+from plot05_gen import extract_margins
+from plot06_gen import extract_leverage_ratios
+
+logger = logging.getLogger(__name__)
+
+# (source file suffix, output file, extractor) for every plot
+GENERATORS = [
+    ('BS.csv', '01_plot_AandL.csv', extract_assets_liabilities),
+    ('-PL.csv', '02_plot_revPL.csv', extract_revenue_profit),
+    ('-PL.csv', '03_plot_expenses.csv', extract_expenses),
+    ('cash-flow.csv', '04_plot_cashflow.csv', extract_cash_flow),
+    ('ratios.csv', '05_plot_margins.csv', extract_margins),
+    ('ratios.csv', '06_plot_leverage.csv', extract_leverage_ratios),
+]
+
+# Plot CSVs that also get a ready-to-render plots/0N_plot_*.json for the dashboard
+PLOT_OUTPUTS = {output_name for _, output_name, _ in GENERATORS}
+
+DERIVED_METRICS_FILE = "derived_metrics.csv"
+
+# (source file suffixes, output file, extractor) for outputs built from several statements
+COMBINED_GENERATORS = [
+    (('BS.csv', '-PL.csv', 'cash-flow.csv'), DERIVED_METRICS_FILE, extract_derived_metrics),
+    (('_quarterly_results.csv', '_annual_results.csv'), TTM_METRICS_FILE, extract_trailing_metrics),
+]
+
+# Canonical period of every statement column, for joining statements
+PERIOD_AXIS_FILE = "period_axis.csv"
+
+# Long company/metric/period/value table of every company's derived metrics, at the root
+UNIVERSE_METRICS_FILE = "derived_metrics_universe.csv"
+
+def is_statement_file(filename):
+    """Check if a file is a statement read by any of the generators"""
+    return (any(filename.endswith(suffix) for suffix, _, _ in GENERATORS)
+            or any(filename.endswith(suffix) for suffixes, _, _ in COMBINED_GENERATORS for suffix in suffixes))
+
+def process_company(foldername, filenames, force=False, outputs=None, dry_run=False, template=None,
+                    validate=False):
+    """Run the extractors over one company folder, reading each statement once
+
+    Outputs whose source statements and generator code are unchanged since
+    the last run (per plots/.manifest.json) are skipped unless force is set.
+    outputs limits the run to those output files; dry_run only lists what
+    would be regenerated. template (bank, nbfc or insurer) swaps in that industry's
+    extractors for the plots it covers. validate hands the
+    parsed values of companies whose statements changed to the parent, which
+    checks them all at once into each one's plots/validation.csv.
+    """
+    statements = {}
+    summary = {"folder": foldername, "outputs": [], "skipped": [], "planned": [], "errors": []}
+    plots_dir = os.path.join(foldername, "plots")
+    old_manifest = load_manifest(plots_dir)
+    # Entries for outputs outside this run are carried over untouched
+    new_manifest = {name: entry for name, entry in old_manifest.items()
+                    if (outputs is not None and name not in outputs) or (not validate and name == COMPANY_ISSUES_FILE)}
+
+    def generate(output_name, extract, source_files, write=None):
+        if outputs is not None and output_name not in outputs:
+            return
+        output_file = os.path.join(plots_dir, output_name)
+        sources = ", ".join(source_files)
+
+        try:
+            entry = old_manifest.get(output_name, {})
+            recorded = entry.get("inputs", {})
+            version = code_version(extract)
+            # Template extractors share one module, so the template is part of the version
+            if getattr(extract, "template", None):
+                version += ":" + extract.template
+            inputs = {name: file_fingerprint(os.path.join(foldername, name), recorded.get(name))
+                      for name in source_files}
+
+            if not force and is_up_to_date(entry, output_file, version, inputs) and (
+                    output_name not in PLOT_OUTPUTS or os.path.exists(dataset_name(output_file))):
+                new_manifest[output_name] = {"generator": version, "inputs": inputs}
+                summary["skipped"].append(output_file)
+                return
+
+            if dry_run:
+                logger.info("Would regenerate %s from: %s", output_file, sources)
+                summary["planned"].append(output_file)
+                return
+
+            logger.debug("%s from: %s", output_name, sources)
+
+            # Each statement is read and parsed once, then shared
+            for name in source_files:
+                file_path = os.path.join(foldername, name)
+                if file_path not in statements:
+                    statements[file_path] = read_statement(file_path)
+
+            result = extract(*[statements[os.path.join(foldername, name)] for name in source_files])
+
+            if result is None:
+                logger.warning("File %s appears to be empty or malformed", sources)
+                summary["errors"].append(f"{sources}: empty or malformed")
+                return
+
+            if write is not None:
+                write(output_file, result)
+            else:
+                write_plot_csv(output_file, *result)
+                if output_name in PLOT_OUTPUTS:
+                    write_plot_dataset(output_file, *result, template=getattr(extract, "template", None))
+            new_manifest[output_name] = {"generator": version, "inputs": inputs}
+            summary["outputs"].append(output_file)
+
+        except Exception as e:
+            logger.error("Error processing %s: %s", sources, e)
+            summary["errors"].append(f"{sources}: {str(e)}")
+
+    for suffix, output_name, extract in GENERATORS:
+        extract = template_extractor(template, output_name) or extract
+        for source_file in [f for f in filenames if f.endswith(suffix)]:
+            generate(output_name, extract, [source_file])
+
+    for suffixes, output_name, extract in COMBINED_GENERATORS:
+        source_files = [next((f for f in sorted(filenames) if f.endswith(suffix)), None) for suffix in suffixes]
+        if all(source_files):
+            generate(output_name, extract, source_files)
+
+    axis_sources = [f for f in sorted(filenames) if statement_type(f)]
+    if axis_sources:
+        generate(PERIOD_AXIS_FILE, extract_period_axis, axis_sources)
+
+    if validate and axis_sources:
+        # Until the parent writes the new issues, the old ones must not pass for current
+        def hand_over(output_file, data):
+            if os.path.exists(output_file):
+                os.remove(output_file)
+            summary["validation"] = data
+
+        ttm_source = os.path.join("plots", TTM_METRICS_FILE)
+        issue_sources = axis_sources + ([ttm_source] if os.path.exists(os.path.join(foldername, ttm_source)) else [])
+        generate(COMPANY_ISSUES_FILE, statements_frame, issue_sources, hand_over)
+
+    if not dry_run and new_manifest != old_manifest:
+        save_manifest(plots_dir, new_manifest)
+
+    return summary
+
+def find_company_folders(root_directory):
+    """List every (folder, filenames) under root that holds at least one statement"""
+    folders = []
+
+    for foldername, subfolders, filenames in os.walk(root_directory):
+        # Never treat generated plots as source statements
+        subfolders[:] = [d for d in subfolders if d != "plots"]
+
+        if any(is_statement_file(f) for f in filenames):
+            folders.append((foldername, filenames))
+
+    return folders
+
+def company_templates(root_directory, sectors_dir=None):
+    """Map company folder key (sector_stats.folder_key) -> industry template, from the sector files if any are found"""
+    source_dir = find_sector_source(root_directory, sectors_dir)
+    if source_dir is None:
+        return {}
+    sector_map = load_sector_map(source_dir)
+    untemplated = untemplated_financial_sectors(sector_map.values())
+    if untemplated:
+        logger.warning("No industry template for %s; their companies get the default plots",
+                       ", ".join(untemplated))
+    templates = {name: sector_template(sector) for name, sector in sector_map.items()}
+    return {name: template for name, template in templates.items() if template}
+
+def process_company_task(task):
+    """Pool entry point: process one company and never let an error escape the worker"""
+    foldername, filenames, options = task
+    start = time.perf_counter()
+    try:
+        summary = process_company(foldername, filenames, **options)
+    except Exception as e:
+        summary = {"folder": foldername, "outputs": [], "skipped": [], "planned": [], "errors": [str(e)]}
+
+    # The one record per company at the default level
+    seconds = round(time.perf_counter() - start, 4)
+    logger.log(logging.WARNING if summary["errors"] else logging.INFO,
+               "%s: %d generated, %d unchanged, %d errors in %.3fs", foldername,
+               len(summary["outputs"]), len(summary["skipped"]), len(summary["errors"]), seconds,
+               extra={"company": os.path.basename(os.path.normpath(foldername)),
+                      "generated": len(summary["outputs"]), "unchanged": len(summary["skipped"]),
+                      "planned": len(summary["planned"]), "errors": summary["errors"], "seconds": seconds})
+
+    # Ship newly learned label scores back to the parent, which saves them once
+    summary["label_cache"] = get_label_cache().take_updates()
+    return summary
+
+def init_worker(log_queue=None, verbose=False, label_cache_file=None):
+    """Keep batched label scoring single-threaded inside pool workers and log through the parent
+
+    Workers score against the parent's label cache file, passed in rather
+    than inherited so spawned and forkserver workers use it too.
+    """
+    label_matching.MATCH_WORKERS = 1
+    if label_cache_file is not None:
+        use_label_cache(label_cache_file)
+    if log_queue is not None:
+        install_queue_handler(log_queue, verbose)
+
+def default_chunksize(n_tasks, workers):
+    """Hand each worker about four chunks so start-up cost is amortized but load stays balanced"""
+    return max(1, n_tasks // (workers * 4))
+
+def universe_entry(root_directory, manifest, output_name, build, input_files, force=False):
+    """Manifest entry for a universe-wide output, and whether it must be rebuilt
+
+    The root's .manifest.json records each universe output's inputs the way
+    a company's plots/.manifest.json does, so an output is rebuilt only when
+    its code, the set of its inputs or one of their contents changed.
+    """
+    entry = manifest.get(output_name, {})
+    recorded = entry.get("inputs", {})
+    inputs = {}
+    for file_path in input_files:
+        if os.path.exists(file_path):
+            name = os.path.relpath(file_path, root_directory)
+            inputs[name] = file_fingerprint(file_path, recorded.get(name))
+    version = code_version(build)
+    stale = force or not is_up_to_date(entry, os.path.join(root_directory, output_name), version, inputs)
+    return {"generator": version, "inputs": inputs}, stale
+
+def run_pipeline(root_directory, workers=1, chunksize=None, force=False, companies=None,
+                 outputs=None, dry_run=False, timings=None, log_queue=None, verbose=False,
+                 sectors_dir=None, validate=False):
+    """Walk the company tree once and generate every out-of-date plots/0N_plot_*.csv
+
+    companies is a list of folder-name patterns and outputs a list of output
+    file names to restrict the run to; timings, if given, is a StageTimer.
+    Pool workers log through log_queue when one is given. When
+    company-sector.json or Category-Companies/ is found in sectors_dir, or
+    else in or beside the root, sector aggregates are built from it and
+    banks, NBFCs and insurers get their industry template. Universe-wide
+    tables are rebuilt only when their inputs changed, and not at all when
+    outputs limits the run. validate keeps each company's
+    plots/validation.csv up to date for the --validate report.
+    """
+    timings = timings or StageTimer()
+    options = {"force": force, "outputs": outputs, "dry_run": dry_run, "validate": validate}
+
+    with timings.stage("discover"):
+        folders = find_company_folders(root_directory)
+        templates = company_templates(root_directory, sectors_dir)
+        tasks = [(foldername, filenames,
+                  dict(options, template=templates.get(folder_key(os.path.basename(os.path.normpath(foldername))))))
+                 for foldername, filenames in folders if matches_company(foldername, companies)]
+
+    with timings.stage("generate"):
+        if workers <= 1 or len(tasks) <= 1:
+            summaries = [process_company_task(task) for task in tasks]
+        else:
+            if chunksize is None:
+                chunksize = default_chunksize(len(tasks), workers)
+
+            with multiprocessing.Pool(workers, initializer=init_worker,
+                                      initargs=(log_queue, verbose, get_label_cache().cache_file)) as pool:
+                summaries = list(pool.imap_unordered(process_company_task, tasks, chunksize=chunksize))
+
+    if validate and not dry_run:
+        with timings.stage("validate"):
+            changed = [summary for summary in summaries if "validation" in summary]
+            if changed:
+                data = pd.concat([summary.pop("validation") for summary in changed], ignore_index=True)
+                flagged = write_company_issues(data, [summary["folder"] for summary in changed])
+                logger.info("Validation: %d issues flagged in %d changed companies", flagged, len(changed))
+
+    with timings.stage("label_cache"):
+        label_cache = get_label_cache()
+        for summary in summaries:
+            label_cache.merge_updates(summary.pop("label_cache"))
+        if not dry_run:
+            label_cache.save()
+
+    # Universe-wide tables always cover every company, not just this run's subset
+    if not dry_run and outputs is None:
+        old_manifest = load_manifest(root_directory)
+        new_manifest = dict(old_manifest)
+
+        metrics_files = [os.path.join(foldername, "plots", DERIVED_METRICS_FILE) for foldername, _ in folders]
+        entry, stale = universe_entry(root_directory, old_manifest, UNIVERSE_METRICS_FILE,
+                                      write_universe_table, metrics_files, force)
+        if stale and entry["inputs"]:
+            with timings.stage("universe"):
+                write_universe_table([os.path.join(root_directory, name) for name in entry["inputs"]],
+                                     os.path.join(root_directory, UNIVERSE_METRICS_FILE))
+            new_manifest[UNIVERSE_METRICS_FILE] = entry
+
+        tensor_files = [os.path.join(foldername, name) for foldername, filenames in folders
+                        for name in sorted(filenames) if name.endswith('ratios.csv')]
+        tensor_files += [os.path.join(foldername, "plots", output_name)
+                         for foldername, _ in folders for output_name in TENSOR_OUTPUTS]
+        entry, stale = universe_entry(root_directory, old_manifest, SCREENING_DIR, build_tensor, tensor_files, force)
+        if stale:
+            with timings.stage("tensor"):
+                shape = build_tensor(folders, os.path.join(root_directory, SCREENING_DIR))
+            new_manifest[SCREENING_DIR] = entry
+            logger.info("Screening tensor: %d companies x %d metrics x %d years", *shape)
+
+        source_dir = find_sector_source(root_directory, sectors_dir)
+        if source_dir is not None:
+            ratio_files = [os.path.join(foldername, "plots", output_name)
+                           for foldername, _ in folders for output_name in RATIO_OUTPUTS]
+            entry, stale = universe_entry(root_directory, old_manifest, SECTOR_STATS_DB, build_sector_stats,
+                                          sector_files(source_dir) + ratio_files, force)
+            if stale:
+                with timings.stage("sectors"):
+                    rows = build_sector_stats([foldername for foldername, _ in folders], source_dir,
+                                              os.path.join(root_directory, SECTOR_STATS_DB))
+                new_manifest[SECTOR_STATS_DB] = entry
+                logger.info("Sector stats: %d rows from %s", rows, source_dir)
+
+        if new_manifest != old_manifest:
+            save_manifest(root_directory, new_manifest)
+
+    return summaries
+
+def regenerate_company(foldername, filenames, outputs=None, template=None):
+    """Bring one company's plots and derived files up to date (watch mode)"""
+    summary = process_company_task((foldername, filenames, {"outputs": outputs, "template": template}))
+    label_cache = get_label_cache()
+    label_cache.merge_updates(summary.pop("label_cache"))
+    label_cache.save()
+    return summary
+
+def summarize(summaries):
+    """Fold per-company results into one run summary"""
+    failed = {s["folder"]: s["errors"] for s in summaries if s["errors"]}
+    return {
+        "folders": len(summaries),
+        "outputs": sum(len(s["outputs"]) for s in summaries),
+        "skipped": sum(len(s["skipped"]) for s in summaries),
+        "planned": sum(len(s["planned"]) for s in summaries),
+        "errors": sum(len(errors) for errors in failed.values()),
+        "failed_folders": failed,
+        "label_cache": get_label_cache().stats(),
+    }
+
+def report(summary, args):
+    """Print the run summary to stdout as text or JSON, and to --summary if given"""
+    if args.summary:
+        write_summary(summary, args.summary)
+
+    if args.format == "json":
+        write_summary(summary, "-")
+        return
+
+    for folder, errors in summary["failed_folders"].items():
+        print(f"Errors in {folder}:")
+        for error in errors:
+            print(f"    {error}")
+
+    print(f"Label cache: {summary['label_cache']}")
+    print(f"Timings: {summary['timings']}")
+    if args.dry_run:
+        print(f"Dry run: {summary['planned']} outputs would be regenerated, {summary['skipped']} unchanged")
+    else:
+        print(f"Processing complete! {summary['folders']} folders, {summary['outputs']} outputs, {summary['skipped']} unchanged, {summary['errors']} errors")
+
+def main(outputs=None, description="Generate all plot CSVs in one pass"):
+    parser = build_parser(description)
+    parser.add_argument("--store", default=None, help="also write the consolidated columnar store to this directory")
+    parser.add_argument("--store-format", choices=STORE_FORMATS, default="parquet", help="store file format (default parquet)")
+    parser.add_argument("--validate", action="store_true",
+                        help=f"check changed companies' statements and write {VALIDATION_REPORT} for the whole universe")
+    parser.add_argument("--sectors", default=None, metavar="DIR",
+                        help="directory with company-sector.json / Category-Companies (default: root or its parent)")
+    parser.add_argument("--label-cache", default=None, metavar="FILE",
+                        help="read and save learned label scores in FILE instead of label_cache.json")
+    parser.add_argument("--watch", action="store_true",
+                        help="after the run, keep regenerating companies as their statements land")
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE,
+                        help=f"seconds a company must be quiet before it is regenerated (default {DEFAULT_SETTLE})")
+    parser.add_argument("--poll", action="store_true", help="poll the tree instead of using inotify")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f"seconds between scans when polling (default {DEFAULT_POLL_INTERVAL})")
+    args = parser.parse_args()
+
+    root_directory = resolve_root(args)
+    if args.label_cache:
+        use_label_cache(args.label_cache)
+
+    # Validate directory exists
+    if not os.path.exists(root_directory):
+        print(f"Error: Directory '{root_directory}' does not exist")
+        sys.exit(1)
+
+    # All logging goes to stderr from a listener thread; stdout carries only the summary
+    log_queue, listener = start_logging(args.verbose, args.log_json)
+    timings = StageTimer()
+
+    try:
+        logger.info("Starting processing of directory: %s", root_directory)
+
+        summary = summarize(run_pipeline(root_directory, args.workers, args.chunksize, args.force,
+                                         company_patterns(args), outputs, args.dry_run, timings,
+                                         log_queue, args.verbose, args.sectors, args.validate))
+
+        if args.store and not args.dry_run:
+            with timings.stage("store"):
+                folders = [(foldername, filenames) for foldername, filenames in find_company_folders(root_directory)
+                           if matches_company(foldername, company_patterns(args))]
+                summary["store_values"] = build_store(folders, args.store, args.store_format)
+            logger.info("Store: %d values written to %s", summary["store_values"], args.store)
+
+        if args.validate and not args.dry_run:
+            # The outlier check reads ratios from the store when it was just written for every company
+            store = args.store if "store_values" in summary and company_patterns(args) is None else None
+            with timings.stage("validation_report"):
+                flagged = validate(find_company_folders(root_directory),
+                                   os.path.join(root_directory, VALIDATION_REPORT), store, args.store_format)
+            logger.info("Validation: %d issues flagged in %s", sum(flagged.values()), VALIDATION_REPORT)
+
+        summary["root"] = root_directory
+        summary["dry_run"] = args.dry_run
+        summary["timings"] = dict(timings.stages, total=timings.total())
+        report(summary, args)
+
+        if args.watch and not args.dry_run:
+            templates = company_templates(root_directory, args.sectors)
+
+            def regenerate(foldername, filenames):
+                if matches_company(foldername, company_patterns(args)):
+                    regenerate_company(foldername, filenames, outputs,
+                                       templates.get(folder_key(os.path.basename(os.path.normpath(foldername)))))
+
+            required = sorted({suffix for suffix, _, _ in GENERATORS})
+            watch(root_directory, is_statement_file, required, regenerate,
+                  args.settle, args.poll_interval, args.poll)
+    finally:
+        listener.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import fnmatch
+import json
+import os
+import time
+from contextlib import contextmanager
+
+def build_parser(description):
+    """Arguments shared by every augmentation entry point"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("root", nargs="?", default=None,
+                        help="root directory of company folders (prompted for if omitted)")
+    parser.add_argument("--companies", action="append", default=None, metavar="PATTERN",
+                        help="only process company folders whose name matches; glob patterns, "
+                             "comma-separated or repeated")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (default 1)")
+    parser.add_argument("--chunksize", type=int, default=None, help="companies handed to a worker at a time")
+    parser.add_argument("--force", action="store_true", help="regenerate every output, ignoring the manifests")
+    parser.add_argument("--dry-run", action="store_true", help="list the outputs that would be regenerated and exit")
+    parser.add_argument("--format", choices=["text", "json"], default="text",
+                        help="print the run summary on stdout as text or as JSON")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="log per-row detail (matched, included and excluded labels)")
+    parser.add_argument("--log-json", action="store_true", help="write log records to stderr as JSON lines")
+    parser.add_argument("--summary", default=None, metavar="FILE", help="also write the JSON run summary to FILE")
+    return parser
+
+def resolve_root(args):
+    """Root directory from the command line, falling back to the interactive prompt"""
+    root_directory = args.root
+    if root_directory is None:
+        # Get the root directory (you can modify this path as needed)
+        root_directory = input("Enter the root directory path: ").strip()
+    return root_directory
+
+def company_patterns(args):
+    """Flatten --companies into a list of patterns, or None for every company"""
+    if not args.companies:
+        return None
+    return [p.strip() for value in args.companies for p in value.split(",") if p.strip()]
+
+def matches_company(foldername, patterns):
+    """Check a company folder against the --companies patterns"""
+    if patterns is None:
+        return True
+    name = os.path.basename(os.path.normpath(foldername))
+    return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+class StageTimer:
+    """Wall-clock seconds spent in each named stage of a run"""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = round(self.stages.get(name, 0.0) + time.perf_counter() - start, 4)
+
+    def total(self):
+        return round(sum(self.stages.values()), 4)
+
+def write_summary(summary, file_path):
+    """Write the JSON run summary; '-' writes to stdout"""
+    text = json.dumps(summary, indent=1, sort_keys=True)
+    if file_path == "-":
+        print(text)
+        return
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(text + "\n")
@@ -0,0 +1,338 @@
+import argparse
+import csv
+import io
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import re
+import shutil
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import label_matching
+from aug_pipeline import COMBINED_GENERATORS, GENERATORS, find_company_folders, run_pipeline
+from batch_cli import StageTimer, write_summary
+from sector_stats import SECTOR_FILE, folder_key
+from statement_io import decode_statement, read_statement
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Real scraper output the synthetic companies are cut from, and its sector list
+TEMPLATE_DIR = os.path.join(SCRIPT_DIR, "..", "scraper", "MC_scraper", "output", "Companies")
+SECTOR_SOURCE = os.path.join(SCRIPT_DIR, "..", "scraper", "MC_scraper", "output", SECTOR_FILE)
+
+# Results of a reference run written by --save-baseline, compared against unless --baseline says
+# otherwise. Timings only compare on the machine that recorded them, so the file is not committed.
+BASELINE_FILE = os.path.join(SCRIPT_DIR, "benchmark_baseline.json")
+
+DEFAULT_SIZES = [100, 1000, 10000]
+
+# Written into each generated universe so a later run with the same size and seed reuses it
+UNIVERSE_MARKER = "universe.json"
+
+# File name endings of the statements the scraper writes for a company
+STATEMENT_SUFFIXES = ["-BS.csv", "-PL.csv", "_cash-flow.csv", "_ratios.csv", "_quarterly_results.csv",
+                      "_half-yearly_results.csv", "_nine-monthly_results.csv", "_annual_results.csv"]
+
+# Share of line-item labels rewritten the way the site varies them between companies
+LABEL_VARIANT_RATE = 0.15
+LABEL_VARIANTS = [
+    lambda label: label.replace(" And ", " & ") if " And " in label else label.replace(" & ", " and "),
+    lambda label: label.lower(),
+    lambda label: label.title(),
+    lambda label: label.replace(" ", "  ", 1),
+    lambda label: label + " ",
+]
+# Share of values the site has no figure for ("--")
+MISSING_VALUE_RATE = 0.03
+# Share of companies written in latin-1 with a non-ASCII name
+LATIN1_RATE = 0.1
+# Company name in a statement title
+TITLE_NAME_RE = re.compile(r"(?<= of ).*(?= \()")
+# Most "--" padding columns appended to a company_data style file
+MAX_PADDING_COLUMNS = 3
+
+def load_templates(template_dir=TEMPLATE_DIR):
+    """[{statement suffix: rows}] for every company folder under template_dir"""
+    templates = []
+    for folder in sorted(os.listdir(template_dir)):
+        statements = {}
+        for filename in sorted(os.listdir(os.path.join(template_dir, folder))):
+            suffix = next((s for s in STATEMENT_SUFFIXES if filename.endswith(s)), None)
+            if suffix is None:
+                continue
+            with open(os.path.join(template_dir, folder, filename), 'rb') as f:
+                text, _ = decode_statement(f.read())
+            statements[suffix] = list(csv.reader(io.StringIO(text)))
+        if statements:
+            templates.append(statements)
+    return templates
+
+def load_sectors(sector_file=SECTOR_SOURCE):
+    """Sectors as often as the scraped universe has them, None for companies without one"""
+    try:
+        with open(sector_file, 'r', encoding='utf-8') as f:
+            return list(json.load(f).get("companies", {}).values()) or [None]
+    except (OSError, ValueError):
+        return [None]
+
+def jitter_value(cell, scale, rng):
+    """A scaled, jittered copy of a number cell in the site's format; other cells unchanged"""
+    try:
+        value = float(cell.replace(",", ""))
+    except ValueError:
+        return cell
+    if rng.random() < MISSING_VALUE_RATE:
+        return "--"
+    return f"{value * scale * (1 + rng.gauss(0, 0.05)):,.2f}"
+
+def synthesize_statement(rows, title_name, scale, scraper_shape, rng):
+    """Rows of one synthetic statement cut from a template statement
+
+    Keeps the template's line items in order with scaled values, drops up
+    to one of the oldest periods, varies some labels, and writes either the
+    scraper's padding (" " column) or company_data's ("--" columns and cells).
+    """
+    if not rows:
+        return []
+    periods = [c for c, cell in enumerate(rows[0]) if c and cell.strip() not in ("", "--")]
+    periods = periods[:len(periods) - rng.choice([0, 0, 1])] if len(periods) > 1 else periods
+    padding = [" ", ""] if scraper_shape else ["--"] * rng.randint(1, MAX_PADDING_COLUMNS)
+
+    # "Balance Sheet of ABB India (in Rs. Cr.)" -> "Balance Sheet of <title_name> (in Rs. Cr.)"
+    title = TITLE_NAME_RE.sub(title_name, rows[0][0], count=1)
+    output = [[title] + [rows[0][c] for c in periods] + padding]
+    for row in rows[1:]:
+        label = row[0] if row else ""
+        cells = [row[c] if c < len(row) else "" for c in periods]
+        # Upper-case section headers stay as they are; the statement tree keys on them
+        if label.strip() and label != label.upper() and rng.random() < LABEL_VARIANT_RATE:
+            label = rng.choice(LABEL_VARIANTS)(label)
+        cells = [jitter_value(cell, scale, rng) for cell in cells]
+        output.append([label] + cells + padding)
+
+    if not scraper_shape:
+        output = [[cell if cell.strip() else "--" for cell in row] for row in output]
+    return output
+
+def write_company(root, index, templates, sectors, seed):
+    """Write synthetic company number index; returns (company name, sector)"""
+    rng = random.Random(seed * 1000003 + index)
+    statements = templates[rng.randrange(len(templates))]
+    name = f"Synthetic {index:05d}"
+    latin1 = rng.random() < LATIN1_RATE
+    title_name = f"Société {name}" if latin1 else name
+    scale = rng.lognormvariate(0, 1.5)
+    scraper_shape = rng.random() < 0.5
+
+    folder = os.path.join(root, folder_key(name))
+    os.makedirs(folder, exist_ok=True)
+    for suffix, rows in statements.items():
+        # Ratios and per-share figures do not grow with the company
+        statement_scale = rng.lognormvariate(0, 0.3) if suffix == "_ratios.csv" else scale
+        rows = synthesize_statement(rows, title_name, statement_scale, scraper_shape, rng)
+        with open(os.path.join(folder, name + suffix), 'w', encoding='latin-1' if latin1 else 'utf-8',
+                  newline='') as f:
+            csv.writer(f, quoting=csv.QUOTE_ALL if scraper_shape else csv.QUOTE_MINIMAL,
+                       lineterminator="\n").writerows(rows)
+    return name, rng.choice(sectors)
+
+def build_universe(root, companies, seed=0, template_dir=TEMPLATE_DIR):
+    """Generate companies synthetic company folders under root, reusing a matching earlier universe
+
+    Company i is the same for every universe size with the same seed, so
+    a smaller universe is a prefix of a larger one. Returns seconds spent.
+    """
+    marker = {"companies": companies, "seed": seed, "templates": os.path.abspath(template_dir)}
+    marker_file = os.path.join(root, UNIVERSE_MARKER)
+    try:
+        with open(marker_file, 'r', encoding='utf-8') as f:
+            if json.load(f) == marker:
+                return 0.0
+    except (OSError, ValueError):
+        pass
+
+    start = time.perf_counter()
+    shutil.rmtree(root, ignore_errors=True)
+    os.makedirs(root)
+    templates, sectors = load_templates(template_dir), load_sectors()
+    company_sectors = {}
+    for index in range(companies):
+        name, sector = write_company(root, index, templates, sectors, seed)
+        company_sectors[name] = sector
+    with open(os.path.join(root, SECTOR_FILE), 'w', encoding='utf-8') as f:
+        json.dump({"companies": company_sectors}, f)
+    with open(marker_file, 'w', encoding='utf-8') as f:
+        json.dump(marker, f)
+    return round(time.perf_counter() - start, 4)
+
+def peak_rss_mb():
+    """Peak resident set size of this process or any of its workers, in MB; None where unsupported"""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def time_generators(root):
+    """Seconds spent reading statements and in each extractor over every company under root
+
+    Summed unrounded: a single extractor call can take well under the
+    StageTimer's 0.1 ms resolution.
+    """
+    stages = {}
+
+    def timed(stage, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        stages[stage] = stages.get(stage, 0.0) + time.perf_counter() - start
+        return result
+
+    for foldername, filenames in find_company_folders(root):
+        statements = {}
+
+        def statement(name):
+            if name not in statements:
+                statements[name] = timed("read", read_statement, os.path.join(foldername, name))
+            return statements[name]
+
+        for suffix, output_name, extract in GENERATORS:
+            for source_file in [f for f in filenames if f.endswith(suffix)]:
+                timed(output_name, extract, statement(source_file))
+
+        for suffixes, output_name, extract in COMBINED_GENERATORS:
+            source_files = [next((f for f in sorted(filenames) if f.endswith(suffix)), None) for suffix in suffixes]
+            if all(source_files):
+                timed(output_name, extract, *[statement(name) for name in source_files])
+    return {stage: round(seconds, 4) for stage, seconds in stages.items()}
+
+def measure(kind, root, workers, results, start_method=None):
+    """Child process entry point: time one kind of run ("generators" or "pipeline") from a cold label cache
+
+    The pipeline is timed as a --force run, which rebuilds every output and
+    universe-wide table, then as a rerun over the unchanged universe, which
+    is what most runs cost. start_method is the parent's, so run_pipeline's
+    pool starts its workers the way aug_pipeline.py would, not by spawn.
+    """
+    if start_method:
+        multiprocessing.set_start_method(start_method, force=True)
+    logging.disable(logging.WARNING)
+    cache_file = os.path.join(root, f"label_cache.{kind}.json")
+    if os.path.exists(cache_file):
+        os.remove(cache_file)
+    # run_pipeline hands this file to its pool workers, so nothing learned here reaches the script directory's
+    label_matching.use_label_cache(cache_file)
+
+    if kind == "generators":
+        stages = time_generators(root)
+    else:
+        timer = StageTimer()
+        run_pipeline(root, workers, force=True, timings=timer)
+        stages = timer.stages
+        rerun = StageTimer()
+        run_pipeline(root, workers, timings=rerun)
+    result = {"stages": stages, "seconds": round(sum(stages.values()), 4), "peak_rss_mb": peak_rss_mb()}
+    if kind == "pipeline":
+        result["rerun"] = {"stages": rerun.stages, "seconds": rerun.total()}
+    results.put(result)
+
+def run_measurement(kind, root, workers):
+    """Run measure in a fresh process, so peak RSS and the label cache start clean"""
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=measure,
+                              args=(kind, root, workers, results, multiprocessing.get_start_method()))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+def run_benchmark(sizes, work_dir, seed=0, workers=1, template_dir=TEMPLATE_DIR):
+    """Build a universe per size and time the extractors and the whole pipeline over it"""
+    results = {
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count(), "workers": workers, "seed": seed,
+                    "start_method": multiprocessing.get_start_method()},
+        "sizes": {},
+    }
+    for companies in sizes:
+        root = os.path.join(work_dir, f"universe_{companies}")
+        built = build_universe(root, companies, seed, template_dir)
+        results["sizes"][str(companies)] = {
+            "companies": companies,
+            "build_seconds": built,
+            "generators": run_measurement("generators", root, workers),
+            "pipeline": run_measurement("pipeline", root, workers),
+        }
+    return results
+
+def delta(seconds, baseline_seconds):
+    """Change against the baseline for a report line, or "" without one"""
+    if not baseline_seconds:
+        return ""
+    return f" (baseline {baseline_seconds:.3f}s, {100 * (seconds - baseline_seconds) / baseline_seconds:+.1f}%)"
+
+def report(results, baseline=None):
+    """Print throughput, peak RSS and per-stage times per size, against the baseline when given"""
+    if baseline and baseline.get("machine") != results["machine"]:
+        print(f"Warning: the baseline was recorded with {baseline.get('machine')}, this run with "
+              f"{results['machine']}; the deltas compare different setups")
+    for size, result in results["sizes"].items():
+        reference = (baseline or {}).get("sizes", {}).get(size, {})
+        companies = result["companies"]
+        built = f" (universe built in {result['build_seconds']:.1f}s)" if result["build_seconds"] else ""
+        print(f"{companies} companies{built}")
+        for kind in ("pipeline", "generators"):
+            run, previous = result[kind], reference.get(kind, {})
+            throughput = companies / run["seconds"] if run["seconds"] else 0.0
+            rss = f", peak RSS {run['peak_rss_mb']:.1f} MB" if run["peak_rss_mb"] is not None else ""
+            print(f"  {kind}: {run['seconds']:.2f}s, {throughput:.1f} companies/s{rss}"
+                  f"{delta(run['seconds'], previous.get('seconds'))}")
+            for stage, seconds in run["stages"].items():
+                print(f"    {stage:<24} {seconds:8.3f}s{delta(seconds, previous.get('stages', {}).get(stage))}")
+            if "rerun" in run:
+                rerun = run["rerun"]
+                print(f"  rerun with nothing changed: {rerun['seconds']:.2f}s"
+                      f"{delta(rerun['seconds'], previous.get('rerun', {}).get('seconds'))}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the augmentation scripts over synthetic company universes")
+    parser.add_argument("--sizes", default=",".join(str(n) for n in DEFAULT_SIZES),
+                        help="comma-separated universe sizes (default %(default)s)")
+    parser.add_argument("--work-dir", default=os.path.join(SCRIPT_DIR, "benchmark_data"),
+                        help="where the synthetic universes are generated and kept between runs")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic universe (default 0)")
+    parser.add_argument("--workers", type=int, default=1, help="pipeline worker processes (default 1)")
+    parser.add_argument("--templates", default=TEMPLATE_DIR, help="scraper Companies folder to cut companies from")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="results to compare against (default %(default)s)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="write this run's results to the baseline file, to compare later runs on this machine against")
+    parser.add_argument("--output", default=None, metavar="FILE", help="also write the JSON results to FILE ('-' for stdout)")
+    args = parser.parse_args()
+
+    sizes = [int(n) for n in args.sizes.split(",") if n.strip()]
+    results = run_benchmark(sizes, args.work_dir, args.seed, args.workers, args.templates)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    report(results, baseline)
+
+    if args.output:
+        write_summary(results, args.output)
+    if args.save_baseline:
+        write_summary(results, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import csv
+import os
+import numpy as np
+from label_matching import find_best_matches
+from plot02_gen import find_revenue_label
+
+# Line items read from each statement, by the label used in the formulas below
+BALANCE_SHEET_ITEMS = [
+    "Total Shareholders Funds",
+    "Reserves and Surplus",
+    "Long Term Borrowings",
+    "Short Term Borrowings",
+    "Total Current Liabilities",
+    "Total Current Assets",
+    "Total Assets",
+]
+
+PROFIT_LOSS_ITEMS = [
+    "Finance Costs",
+    "Profit/Loss Before Tax",
+    "Profit/Loss For The Period",
+]
+
+CASH_FLOW_ITEMS = [
+    "Net CashFlow From Operating Activities",
+    "Net Cash Used In Investing Activities",
+]
+
+def line_item_series(statement, labels, periods, matches=None):
+    """Values of each label on the shared canonical period axis, NaN where missing"""
+    if matches is None:
+        matches = find_best_matches(labels, statement.label_index)
+    positions = statement.period_index.align(periods)
+
+    series = {}
+    for label in labels:
+        values = np.full(len(periods), np.nan)
+        if matches.get(label) is not None and statement.values.size:
+            row = statement.values[statement.tree.row_of(matches[label])]
+            found = np.array(positions) >= 0
+            values[found] = row[np.array(positions)[found]]
+        series[label] = values
+    return series
+
+def ratio(numerator, denominator):
+    """Elementwise division that gives NaN instead of inf for a zero denominator"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = np.divide(numerator, denominator)
+    result[~np.isfinite(result)] = np.nan
+    return result
+
+def previous(values, years=1, fiscal_years=None):
+    """Line each period up with the one `years` before it, NaN where there is none
+
+    With fiscal_years (one per period) the earlier period is the one whose
+    fiscal year is `years` lower, so a missing year or a year-end change
+    gives NaN rather than a longer gap; a fiscal year reported twice is
+    ambiguous and never used. Without them the series is taken to be
+    newest first on a regular grid and shifted by position.
+    """
+    shifted = np.full_like(values, np.nan)
+    if fiscal_years is None:
+        if years < values.shape[-1]:
+            shifted[..., :-years] = values[..., years:]
+        return shifted
+
+    fiscal_years = list(fiscal_years)
+    position = {year: i for i, year in enumerate(fiscal_years) if fiscal_years.count(year) == 1}
+    for i, year in enumerate(fiscal_years):
+        if year in position and year - years in position:
+            shifted[..., i] = values[..., position[year - years]]
+    return shifted
+
+def growth(values, years=1, fiscal_years=None):
+    """Compound annual growth over `years`; NaN unless both ends are positive"""
+    start = previous(values, years, fiscal_years)
+    valid = (start > 0) & (values > 0)
+    result = np.full_like(values, np.nan)
+    result[valid] = (values[valid] / start[valid]) ** (1.0 / years) - 1
+    return result
+
+def yoy_growth(values, fiscal_years=None):
+    """Year-on-year change relative to the size of the prior year"""
+    start = previous(values, fiscal_years=fiscal_years)
+    return ratio(values - start, np.abs(start))
+
+def compute_metrics(items, fiscal_years=None):
+    """DuPont, Altman Z', growth and funding metrics from aligned line items
+
+    Every item is an array with periods on the last axis, newest first, so
+    the same code works for one company or a stacked (company x period)
+    universe. Year-end balances are used throughout. Growth and year-on-year
+    changes compare fiscal years when fiscal_years (one per period) is
+    given, and adjacent periods otherwise.
+    """
+    revenue = items["Revenue"]
+    net_profit = items["Profit/Loss For The Period"]
+    pbt = items["Profit/Loss Before Tax"]
+    ebit = pbt + np.nan_to_num(items["Finance Costs"])
+    equity = items["Total Shareholders Funds"]
+    total_assets = items["Total Assets"]
+    total_liabilities = total_assets - equity
+    working_capital = items["Total Current Assets"] - items["Total Current Liabilities"]
+    long_term, short_term = items["Long Term Borrowings"], items["Short Term Borrowings"]
+    debt = np.where(np.isnan(long_term) & np.isnan(short_term), np.nan,
+                    np.nan_to_num(long_term) + np.nan_to_num(short_term))
+    free_cash_flow = items["Net CashFlow From Operating Activities"] + items["Net Cash Used In Investing Activities"]
+    asset_change = total_assets - previous(total_assets, fiscal_years=fiscal_years)
+    debt_change = debt - previous(debt, fiscal_years=fiscal_years)
+    asset_growth = np.where(asset_change > 0, asset_change, np.nan)
+
+    net_margin = ratio(net_profit, revenue)
+    asset_turnover = ratio(revenue, total_assets)
+    equity_multiplier = ratio(total_assets, equity)
+
+    # Altman Z' (private-firm variant, book value of equity)
+    altman_z = (0.717 * ratio(working_capital, total_assets)
+                + 0.847 * ratio(items["Reserves and Surplus"], total_assets)
+                + 3.107 * ratio(ebit, total_assets)
+                + 0.420 * ratio(equity, total_liabilities)
+                + 0.998 * asset_turnover)
+
+    return {
+        "Net Profit Margin (%)": 100 * net_margin,
+        "Asset Turnover (x)": asset_turnover,
+        "Equity Multiplier (x)": equity_multiplier,
+        "Return on Equity (%)": 100 * net_margin * asset_turnover * equity_multiplier,
+        "Tax Burden (x)": ratio(net_profit, pbt),
+        "Interest Burden (x)": ratio(pbt, ebit),
+        "EBIT Margin (%)": 100 * ratio(ebit, revenue),
+        "Altman Z' Score": altman_z,
+        "Revenue Growth YoY (%)": 100 * yoy_growth(revenue, fiscal_years),
+        "Net Profit Growth YoY (%)": 100 * yoy_growth(net_profit, fiscal_years),
+        "Total Assets Growth YoY (%)": 100 * yoy_growth(total_assets, fiscal_years),
+        "Revenue 3Y CAGR (%)": 100 * growth(revenue, 3, fiscal_years),
+        "Net Profit 3Y CAGR (%)": 100 * growth(net_profit, 3, fiscal_years),
+        "Free Cash Flow": free_cash_flow,
+        "Change in Borrowings": debt_change,
+        "Asset Growth Funded by FCF (%)": 100 * ratio(free_cash_flow, asset_growth),
+        "Asset Growth Funded by Debt (%)": 100 * ratio(debt_change, asset_growth),
+    }
+
+def format_value(value):
+    """Format a metric like the plot CSVs: two decimals, or NA"""
+    return "NA" if np.isnan(value) else f"{value:.2f}"
+
+def extract_derived_metrics(balance_sheet, profit_loss, cash_flow):
+    """Compute the derived-metrics table for one company from its BS, PL and cash-flow statements"""
+    if not profit_loss.rows or not balance_sheet.rows:
+        return None
+
+    # The PL periods are the axis; other statements are aligned to them by canonical period
+    periods = profit_loss.period_index.keys
+
+    pl_matches = find_best_matches(["Total Revenue", "Total Income"] + PROFIT_LOSS_ITEMS,
+                                   profit_loss.label_index)
+    revenue_label, _ = find_revenue_label(pl_matches)
+    pl_matches["Revenue"] = revenue_label
+
+    items = line_item_series(profit_loss, ["Revenue"] + PROFIT_LOSS_ITEMS, periods, pl_matches)
+    items.update(line_item_series(balance_sheet, BALANCE_SHEET_ITEMS, periods))
+    items.update(line_item_series(cash_flow, CASH_FLOW_ITEMS, periods))
+
+    metrics = compute_metrics(items, profit_loss.period_index.fiscal_years)
+    headers = [''] + profit_loss.period_index.labels
+    rows = [[name] + [format_value(v) for v in values] for name, values in metrics.items()]
+    return headers, rows
+
+def write_universe_table(output_files, output_file):
+    """Stack every company's derived_metrics.csv into one long company/metric/period/value table"""
+    with open(output_file, 'w', encoding='utf-8', newline='') as out:
+        writer = csv.writer(out, lineterminator='\n')
+        writer.writerow(["company", "metric", "period", "value"])
+        for metrics_file in sorted(output_files):
+            company = os.path.basename(os.path.dirname(os.path.dirname(metrics_file)))
+            with open(metrics_file, 'r', encoding='utf-8', newline='') as f:
+                records = list(csv.reader(f))
+            if not records:
+                continue
+            periods = records[0][1:]
+            for row in records[1:]:
+                for period, value in zip(periods, row[1:]):
+                    if value != "NA":
+                        writer.writerow([company, row[0], period, value])
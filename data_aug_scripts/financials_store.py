@@ -0,0 +1,134 @@
+import logging
+import os
+import numpy as np
+from label_matching import get_label_cache
+from periods import statement_type
+from statement_io import read_statement
+from trailing_metrics import TTM_METRICS_FILE
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+except ImportError:
+    pa = ds = fs = None
+
+logger = logging.getLogger(__name__)
+
+STORE_FORMATS = ['parquet', 'ipc']
+
+# Pipeline outputs stored alongside the scraped statements, read from plots/
+STORED_OUTPUTS = [TTM_METRICS_FILE]
+
+def require_pyarrow():
+    """Fail with an install hint when pyarrow is missing"""
+    if pa is None:
+        raise ImportError("The consolidated store needs pyarrow: pip install pyarrow")
+
+def statement_records(company, statement_name, statement):
+    """Flatten one statement into long columns, one entry per non-empty value"""
+    # Padding columns are not periods and never hold data
+    index = statement.period_index
+    if not len(index) or not statement.rows:
+        return None
+
+    values = statement.values[:, index.columns]
+    rows, cols = np.nonzero(~np.isnan(values))
+    if not len(rows):
+        return None
+
+    label_cache = get_label_cache()
+    line_items = np.array([label_cache.canonical(label) for label in statement.labels], dtype=object)
+
+    return {
+        "company": [company] * len(rows),
+        "statement": [statement_name] * len(rows),
+        "line_item": line_items[rows].tolist(),
+        "row": rows.astype(np.int32),
+        "period": np.array(index.keys, dtype=object)[cols].tolist(),
+        "period_end": np.array(index.ends, dtype="datetime64[D]")[cols],
+        "months": np.array(index.months, dtype=np.int8)[cols],
+        "header": np.array(index.labels, dtype=object)[cols].tolist(),
+        "value": values[rows, cols],
+    }
+
+def company_records(foldername, filenames):
+    """Long-format records for every stored statement and pipeline output in one company folder"""
+    company = os.path.basename(os.path.normpath(foldername))
+    sources = [os.path.join(foldername, f) for f in sorted(filenames)]
+    sources += [os.path.join(foldername, "plots", f) for f in STORED_OUTPUTS
+                if os.path.exists(os.path.join(foldername, "plots", f))]
+    records = []
+    for file_path in sources:
+        kind = statement_type(os.path.basename(file_path))
+        if kind is None:
+            continue
+        name, _ = kind
+        try:
+            result = statement_records(company, name, read_statement(file_path))
+        except Exception as e:
+            logger.error("Error adding %s to the store: %s", os.path.basename(file_path), e)
+            continue
+        if result is not None:
+            records.append(result)
+    return records
+
+def build_store(company_folders, store_dir, store_format='parquet'):
+    """Write every company's statements as one dataset partitioned by statement type
+
+    Rows are sorted by company, line item and period so row-group statistics
+    let readers skip most of a partition when filtering on any of them; the
+    repeated strings are dictionary-encoded by the file format.
+    """
+    require_pyarrow()
+    records = []
+    for foldername, filenames in company_folders:
+        records.extend(company_records(foldername, filenames))
+    if not records:
+        return 0
+
+    table = pa.table({
+        "company": pa.array([c for r in records for c in r["company"]], pa.string()),
+        "statement": pa.array([s for r in records for s in r["statement"]], pa.string()),
+        "line_item": pa.array([l for r in records for l in r["line_item"]], pa.string()),
+        "row": pa.array(np.concatenate([r["row"] for r in records])),
+        "period": pa.array([p for r in records for p in r["period"]], pa.string()),
+        "period_end": pa.array(np.concatenate([r["period_end"] for r in records])),
+        "months": pa.array(np.concatenate([r["months"] for r in records])),
+        "header": pa.array([h for r in records for h in r["header"]], pa.string()),
+        "value": pa.array(np.concatenate([r["value"] for r in records])),
+    })
+    table = table.sort_by([("statement", "ascending"), ("company", "ascending"),
+                           ("line_item", "ascending"), ("period", "ascending")])
+
+    ds.write_dataset(table, store_dir, format=store_format,
+                     partitioning=ds.partitioning(pa.schema([("statement", pa.string())]), flavor="hive"),
+                     existing_data_behavior="delete_matching")
+    return table.num_rows
+
+def open_store(store_dir, store_format='parquet'):
+    """Open the consolidated store as a memory-mapped dataset"""
+    require_pyarrow()
+    return ds.dataset(store_dir, format=store_format, partitioning="hive",
+                      filesystem=fs.LocalFileSystem(use_mmap=True))
+
+def query_store(store_dir, statement=None, companies=None, line_items=None, periods=None,
+                columns=None, store_format='parquet'):
+    """Load matching rows as a DataFrame; filters are pushed down to the files
+
+    statement prunes whole partitions, the other filters skip row groups by
+    their statistics, e.g.
+    query_store(path, "ratios", companies=pharma, line_items=["Return on Capital Employed (%)"])
+    """
+    dataset = open_store(store_dir, store_format)
+    conditions = []
+    if statement is not None:
+        conditions.append(ds.field("statement") == statement)
+    for name, wanted in (("company", companies), ("line_item", line_items), ("period", periods)):
+        if wanted is not None:
+            conditions.append(ds.field(name).isin(list(wanted)))
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
@@ -0,0 +1,251 @@
+import argparse
+import csv
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from sector_stats import find_sector_source
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Fixed corpora the outputs are snapshotted over: the backend's companies and the recorded scraper sample
+DEFAULT_CORPORA = {
+    "company_data": os.path.join(SCRIPT_DIR, "..", "Balance Sheet Analyzer", "backend", "company_data"),
+    "scraper_sample": os.path.join(SCRIPT_DIR, "..", "scraper", "MC_scraper", "output", "Companies"),
+}
+
+# Snapshots and their index (corpus paths, timings) live here unless --golden says otherwise
+GOLDEN_DIR = os.path.join(SCRIPT_DIR, "golden")
+GOLDEN_INDEX = "golden.json"
+
+REPORT_COLUMNS = ["corpus", "file", "kind", "row", "column", "label", "expected", "actual"]
+
+# Differences printed per corpus; the --report CSV has all of them
+SHOWN_DIFFERENCES = 20
+
+def run_corpus(source_dir, corpus_dir, work_dir):
+    """Run source_dir's aug_pipeline.py over a fresh copy of corpus_dir; returns its stage timings
+
+    The copy leaves out existing plots/ folders so every output is built
+    from the statements, and the run learns label scores into an empty
+    cache beside work_dir rather than reusing or growing label_cache.json.
+    Sector files next to the corpus are passed on, so industry templates
+    apply as they would in place.
+    """
+    shutil.rmtree(work_dir, ignore_errors=True)
+    shutil.copytree(corpus_dir, work_dir, ignore=shutil.ignore_patterns("plots"))
+    summary_file = work_dir.rstrip(os.sep) + ".summary.json"
+    cache_file = work_dir.rstrip(os.sep) + ".label_cache.json"
+    if os.path.exists(cache_file):
+        os.remove(cache_file)
+
+    pipeline = os.path.join(source_dir, "aug_pipeline.py")
+    command = [sys.executable, "-W", "ignore", pipeline, work_dir, "--force", "--summary", summary_file]
+    with open(pipeline, 'r', encoding='utf-8') as f:
+        # Older trees predate --label-cache and use their own cache file, if any
+        if "--label-cache" in f.read():
+            command += ["--label-cache", cache_file]
+    sectors_dir = find_sector_source(corpus_dir)
+    if sectors_dir is not None:
+        command += ["--sectors", sectors_dir]
+    process = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"aug_pipeline.py failed on {corpus_dir}:\n{process.stderr}")
+
+    with open(summary_file, 'r', encoding='utf-8') as f:
+        return json.load(f)["timings"]
+
+def output_files(root):
+    """Relative paths ("Company/plots/01_plot_AandL.csv") of every generated CSV under root"""
+    files = []
+    for foldername, _, filenames in os.walk(root):
+        if os.path.basename(foldername) != "plots":
+            continue
+        for filename in filenames:
+            if filename.endswith(".csv"):
+                files.append(os.path.relpath(os.path.join(foldername, filename), root).replace(os.sep, "/"))
+    return sorted(files)
+
+def read_rows(file_path):
+    """Rows of an output CSV as written by write_plot_csv"""
+    with open(file_path, 'r', encoding='utf-8', newline='') as f:
+        return list(csv.reader(f))
+
+def same_cell(expected, actual, tolerance):
+    """Cells match as text, or as numbers within tolerance when one is given"""
+    if expected == actual:
+        return True
+    if not tolerance:
+        return False
+    try:
+        return abs(float(expected.replace(",", "")) - float(actual.replace(",", ""))) <= tolerance
+    except ValueError:
+        return False
+
+def row_label(row):
+    """First cell of a row, the series name in every output"""
+    return row[0] if row else ""
+
+def diff_file(expected_rows, actual_rows, tolerance=0.0):
+    """Cell-by-cell differences between two output CSVs as (kind, row, column, label, expected, actual)
+
+    Rows are paired by label when labels are unique in both files, so a
+    dropped or added series shows as one missing or extra row instead of
+    shifting every row after it; otherwise they are paired by position.
+    """
+    expected_labels = [row_label(row) for row in expected_rows]
+    actual_labels = [row_label(row) for row in actual_rows]
+    if len(set(expected_labels)) == len(expected_labels) and len(set(actual_labels)) == len(actual_labels):
+        actual_positions = {label: position for position, label in enumerate(actual_labels)}
+        pairs = [(row, actual_positions.get(label)) for row, label in enumerate(expected_labels)]
+        extra = [position for position, label in enumerate(actual_labels) if label not in set(expected_labels)]
+    else:
+        pairs = [(row, row if row < len(actual_rows) else None) for row in range(len(expected_rows))]
+        extra = list(range(len(expected_rows), len(actual_rows)))
+
+    differences = []
+    for row, position in pairs:
+        expected, label = expected_rows[row], expected_labels[row]
+        if position is None:
+            differences.append(("missing_row", row, "", label, ",".join(expected), ""))
+            continue
+        actual = actual_rows[position]
+        for column in range(max(len(expected), len(actual))):
+            expected_cell = expected[column] if column < len(expected) else ""
+            actual_cell = actual[column] if column < len(actual) else ""
+            if not same_cell(expected_cell, actual_cell, tolerance):
+                differences.append(("cell", row, column, label, expected_cell, actual_cell))
+    for position in extra:
+        differences.append(("extra_row", position, "", actual_labels[position], "", ",".join(actual_rows[position])))
+    return differences
+
+def diff_outputs(golden_root, actual_root, tolerance=0.0):
+    """Differences between a snapshot and a new run as report rows (without the corpus column)"""
+    expected_files, actual_files = set(output_files(golden_root)), set(output_files(actual_root))
+    differences = []
+    for name in sorted(expected_files | actual_files):
+        if name not in actual_files:
+            differences.append({"file": name, "kind": "missing_file"})
+        elif name not in expected_files:
+            differences.append({"file": name, "kind": "extra_file"})
+        else:
+            for kind, row, column, label, expected, actual in diff_file(
+                    read_rows(os.path.join(golden_root, name)), read_rows(os.path.join(actual_root, name)), tolerance):
+                differences.append({"file": name, "kind": kind, "row": row, "column": column,
+                                    "label": label, "expected": expected, "actual": actual})
+    return differences, len(expected_files | actual_files)
+
+def load_index(golden_dir):
+    """The snapshot index, empty when nothing has been snapshotted yet"""
+    try:
+        with open(os.path.join(golden_dir, GOLDEN_INDEX), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"corpora": {}}
+
+def snapshot(corpora, golden_dir, source_dir=SCRIPT_DIR):
+    """Run source_dir's generators over each corpus and keep their outputs and timings as the golden set"""
+    index = load_index(golden_dir)
+    with tempfile.TemporaryDirectory() as scratch:
+        for name, corpus_dir in corpora.items():
+            work_dir = os.path.join(scratch, name)
+            timings = run_corpus(source_dir, corpus_dir, work_dir)
+            target = os.path.join(golden_dir, name)
+            shutil.rmtree(target, ignore_errors=True)
+            files = output_files(work_dir)
+            for relative in files:
+                os.makedirs(os.path.dirname(os.path.join(target, relative)), exist_ok=True)
+                shutil.copyfile(os.path.join(work_dir, relative), os.path.join(target, relative))
+            index["corpora"][name] = {"path": os.path.abspath(corpus_dir), "files": len(files), "timings": timings}
+            print(f"{name}: {len(files)} outputs snapshotted in {timings['total']:.2f}s")
+
+    with open(os.path.join(golden_dir, GOLDEN_INDEX), 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    return index
+
+def print_timings(golden, current):
+    """Per-stage seconds of the new run against the snapshot's"""
+    for stage in sorted(current, key=lambda stage: stage == "total"):
+        seconds = current[stage]
+        before = golden.get(stage)
+        change = f"{100 * (seconds - before) / before:+.1f}%" if before else "n/a"
+        before = f"{before:.3f}s" if before is not None else "-"
+        print(f"    {stage:<12} {before:>10} -> {seconds:8.3f}s  {change}")
+
+def compare(corpora, golden_dir, source_dir=SCRIPT_DIR, tolerance=0.0, report_path=None):
+    """Run source_dir's generators over each snapshotted corpus and diff against the golden outputs
+
+    Returns the number of differences; timings are printed beside them.
+    """
+    index = load_index(golden_dir)
+    rows = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for name, corpus_dir in corpora.items():
+            if name not in index["corpora"]:
+                print(f"{name}: no snapshot in {golden_dir}, run 'snapshot' first")
+                continue
+            work_dir = os.path.join(scratch, name)
+            timings = run_corpus(source_dir, corpus_dir, work_dir)
+            differences, compared = diff_outputs(os.path.join(golden_dir, name), work_dir, tolerance)
+
+            changed = len({d["file"] for d in differences})
+            print(f"{name}: {compared} outputs compared, {changed} differ, {len(differences)} differences")
+            for difference in differences[:SHOWN_DIFFERENCES]:
+                where = "" if difference["kind"].endswith("_file") else f" row {difference['row']}"
+                where += f" col {difference['column']}" if difference["kind"] == "cell" else ""
+                where += f" ({difference['label']})" if where else ""
+                detail = f": {difference['expected']!r} -> {difference['actual']!r}" \
+                    if difference["kind"] == "cell" else ""
+                print(f"    {difference['kind']} {difference['file']}{where}{detail}")
+            if len(differences) > SHOWN_DIFFERENCES:
+                print(f"    ... {len(differences) - SHOWN_DIFFERENCES} more")
+            print_timings(index["corpora"][name]["timings"], timings)
+            rows.extend(dict(difference, corpus=name) for difference in differences)
+
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_COLUMNS, restval="")
+            writer.writeheader()
+            writer.writerows(rows)
+    return len(rows)
+
+def parse_corpora(values):
+    """--corpus NAME=DIR options, or the default corpora"""
+    if not values:
+        return dict(DEFAULT_CORPORA)
+    corpora = {}
+    for value in values:
+        name, _, path = value.partition("=")
+        if not path:
+            name, path = os.path.basename(os.path.normpath(value)), value
+        corpora[name] = path
+    return corpora
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot the generators' outputs over fixed corpora and diff new runs against them")
+    parser.add_argument("command", choices=["snapshot", "compare"],
+                        help="snapshot: record the golden outputs; compare: diff a new run against them")
+    parser.add_argument("--corpus", action="append", default=None, metavar="NAME=DIR",
+                        help="corpus of company folders (default: backend company_data and the scraper sample)")
+    parser.add_argument("--golden", default=GOLDEN_DIR, help="snapshot directory (default %(default)s)")
+    parser.add_argument("--source", default=SCRIPT_DIR,
+                        help="data_aug_scripts directory whose aug_pipeline.py is run (default: this one)")
+    parser.add_argument("--tolerance", type=float, default=0.0,
+                        help="treat numeric cells within this absolute difference as equal (default exact text)")
+    parser.add_argument("--report", default=None, metavar="FILE", help="write every difference to this CSV")
+    args = parser.parse_args()
+
+    corpora = parse_corpora(args.corpus)
+    if args.command == "snapshot":
+        os.makedirs(args.golden, exist_ok=True)
+        snapshot(corpora, args.golden, args.source)
+        return
+
+    differences = compare(corpora, args.golden, args.source, args.tolerance, args.report)
+    sys.exit(1 if differences else 0)
+
+if __name__ == "__main__":
+    main()
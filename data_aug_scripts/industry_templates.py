@@ -0,0 +1,155 @@
+import logging
+from label_matching import find_best_matches
+
+logger = logging.getLogger(__name__)
+
+# Sector (as in company-sector.json, upper case) -> template, matched by whole name.
+# INSURANCE is MoneyControl's insurer sector; the bundled company-sector.json lists none
+SECTOR_TEMPLATES = {
+    "BANKS - PRIVATE SECTOR": "bank",
+    "BANKS - PUBLIC SECTOR": "bank",
+    "FINANCE - GENERAL": "nbfc",
+    "FINANCE - HOUSING": "nbfc",
+    "FINANCE - INVESTMENTS": "nbfc",
+    "FINANCE - LEASING & HIRE PURCHASE": "nbfc",
+    "FINANCE - TERM LENDING INSTITUTIONS": "nbfc",
+    "INSURANCE": "insurer",
+}
+
+# Sectors whose companies the default plots do not fit; one without a template is reported
+FINANCIAL_SECTOR_PREFIXES = ("BANKS", "FINANCE", "INSURANCE")
+
+# Per template and plot: {plotted series: labels to look for, first match wins}. Plots a
+# template leaves out keep the default generator. Series are named like the default plots
+# where they mean the same thing, so the dashboard keys line up. Labels are MoneyControl's
+# for each format (nbfc checked on HDFC Ltd and Arihant Capital).
+TEMPLATES = {
+    # Banks file the RBI format: deposits and advances instead of current/non-current,
+    # interest earned and expended instead of revenue and cost of materials
+    "bank": {
+        "01_plot_AandL.csv": {
+            "Deposits": ["Deposits"],
+            "Borrowings": ["Borrowings"],
+            "Advances": ["Advances"],
+            "Investments": ["Investments"],
+        },
+        "02_plot_revPL.csv": {
+            "Total Revenue": ["Total Income"],
+            "Total Interest Earned": ["Total Interest Earned"],
+            "Profit/Loss for the period": ["Net Profit / Loss for The Year", "Net Profit/Loss for The Year"],
+        },
+        "03_plot_expenses.csv": {
+            "Interest Expended": ["Interest Expended"],
+            "Employee Cost": ["Payments to and Provisions for Employees"],
+            "Depreciation": ["Depreciation"],
+            "Operating Expenses": ["Operating Expenses (excludes Employee Cost & Depreciation)",
+                                   "Operating Expenses"],
+            "Provisions and Contingencies": ["Total Provisions and Contingencies"],
+        },
+        "05_plot_margins.csv": {
+            "Net Interest Margin (X)": ["Net Interest Margin (X)"],
+            "Operating Profit Margin (%)": ["Operating Profit Margin (%)"],
+            "Net Profit Margin (%)": ["Net Profit Margin (%)"],
+            "Return on Equity / Networth (%)": ["Return on Equity / Networth (%)"],
+            "Return on Assets (%)": ["Return on Assets (%)"],
+        },
+        "06_plot_leverage.csv": {
+            "Cost to Income (%)": ["Cost to Income (%)"],
+            "Loans to Deposits (X)": ["Loans to Deposits (X)"],
+            "Cash to Deposits (X)": ["Cash to Deposits (X)"],
+            "Investment to Deposits (X)": ["Investment to Deposits (X)"],
+        },
+    },
+    # NBFCs file Schedule III like other companies, but lend: the loan book and its
+    # funding matter, interest is their cost of sales and current ratios say little
+    "nbfc": {
+        "01_plot_AandL.csv": {
+            "Total Shareholders Funds": ["Total Shareholders Funds"],
+            "Long Term Borrowings": ["Long Term Borrowings"],
+            "Short Term Borrowings": ["Short Term Borrowings"],
+            "Long Term Loans And Advances": ["Long Term Loans And Advances"],
+            "Short Term Loans And Advances": ["Short Term Loans And Advances"],
+        },
+        "05_plot_margins.csv": {
+            "PBT Margin (%)": ["PBT Margin (%)"],
+            "Net Profit Margin (%)": ["Net Profit Margin (%)"],
+            "Return on Networth / Equity (%)": ["Return on Networth / Equity (%)"],
+            "Return on Assets (%)": ["Return on Assets (%)"],
+        },
+        "06_plot_leverage.csv": {
+            "Total Debt/Equity (X)": ["Total Debt/Equity (X)"],
+        },
+    },
+    # Insurers report premiums and claims, and their assets are investments
+    "insurer": {
+        "01_plot_AandL.csv": {
+            "Total Shareholders Funds": ["Total Shareholders Funds", "Share Capital"],
+            "Borrowings": ["Borrowings"],
+            "Investments": ["Investments - Shareholders", "Investments"],
+            "Net Current Assets": ["Net Current Assets"],
+        },
+        "02_plot_revPL.csv": {
+            "Total Revenue": ["Premiums Earned (Net)", "Total Income"],
+            "Profit/Loss before Tax": ["Profit/Loss Before Tax", "Profit Before Tax"],
+            "Profit/Loss for the period": ["Profit/Loss For The Period", "Net Profit / Loss for The Year"],
+        },
+        "03_plot_expenses.csv": {
+            "Claims Incurred": ["Claims Incurred (Net)", "Claims Incurred"],
+            "Commission": ["Commission (Net)", "Commission"],
+            "Operating Expenses": ["Operating Expenses Related To Insurance Business", "Operating Expenses"],
+            "Provisions": ["Provision for Taxation", "Provisions"],
+        },
+        "05_plot_margins.csv": {
+            "Net Profit Margin (%)": ["Net Profit Margin (%)"],
+            "Return on Networth / Equity (%)": ["Return on Networth / Equity (%)", "Return on Equity / Networth (%)"],
+            "Return on Assets (%)": ["Return on Assets (%)"],
+        },
+        "06_plot_leverage.csv": {
+            "Total Debt/Equity (X)": ["Total Debt/Equity (X)"],
+        },
+    },
+}
+
+def sector_template(sector):
+    """Template name for a company's sector, or None for the default generators"""
+    if not sector:
+        return None
+    return SECTOR_TEMPLATES.get(sector.strip().upper())
+
+def untemplated_financial_sectors(sectors):
+    """Banking, finance and insurance sectors among sectors that have no template"""
+    names = {sector.strip().upper() for sector in sectors if sector}
+    return sorted(name for name in names
+                  if name.startswith(FINANCIAL_SECTOR_PREFIXES) and name not in SECTOR_TEMPLATES)
+
+def template_extractor(template, output_name):
+    """Extractor for one plot under a template, or None when the default generator applies"""
+    series = TEMPLATES.get(template, {}).get(output_name)
+    if series is None:
+        return None
+
+    def extract_template_rows(statement):
+        """Rows of the template's series, named as the template says, NA where a series is missing"""
+        if not statement.rows:
+            return None
+
+        # Remove the first header (top-left cell) but keep the rest
+        cleaned_headers = [''] + statement.headers[1:]
+
+        # Match every candidate label in one batched call
+        matches = find_best_matches([label for labels in series.values() for label in labels],
+                                    statement.label_index)
+        output_rows = []
+        for name, labels in series.items():
+            matched_label = next((matches[label] for label in labels if matches[label]), None)
+            if matched_label:
+                output_rows.append([name] + statement.find_row(matched_label)[1:])
+                logger.debug("Found: '%s' for '%s' (%s template)", matched_label, name, template)
+            else:
+                output_rows.append([name] + ["NA"] * (len(cleaned_headers) - 1))
+                logger.debug("Could not find match for '%s' (%s template)", name, template)
+
+        return cleaned_headers, output_rows
+
+    extract_template_rows.template = template
+    return extract_template_rows
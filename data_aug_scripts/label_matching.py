@@ -0,0 +1,292 @@
+import json
+import os
+import re
+import pandas as pd
+import fuzzywuzzy
+from fuzzywuzzy import fuzz, utils
+
+try:
+    from rapidfuzz import fuzz as rf_fuzz, process as rf_process
+except ImportError:
+    rf_fuzz = rf_process = None
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Learned scores, rewritten after every run
+LABEL_CACHE_FILE = os.path.join(SCRIPT_DIR, "label_cache.json")
+# Hand-maintained corrections: {"raw label": "Canonical Label"} or {"raw label": null}
+LABEL_OVERRIDES_FILE = os.path.join(SCRIPT_DIR, "label_overrides.json")
+# Threads used by batched scoring; -1 is all cores, pool workers set 1
+MATCH_WORKERS = -1
+# Lowest score a match is accepted at; cached scores under it are only upper bounds
+MATCH_THRESHOLD = 85
+# Scores depend on fuzzywuzzy's version, its matcher (difflib or python-Levenshtein) and the
+# threshold they were bounded at; a cache written under another scorer is discarded
+SCORER_VERSION = (f"token_sort_ratio/fuzzywuzzy-{fuzzywuzzy.__version__}/"
+                  f"{fuzz.SequenceMatcher.__module__}/{MATCH_THRESHOLD}")
+
+PUNCTUATION_RE = re.compile(r'[^\w\s]')
+SPACES_RE = re.compile(r'\s+')
+
+def normalize_text(text):
+    """Normalize text for fuzzy matching by removing punctuation and standardizing spaces"""
+    if pd.isna(text):
+        return ""
+    # Convert to string, lowercase, remove punctuation, and normalize spaces
+    text = str(text).lower()
+    text = PUNCTUATION_RE.sub('', text)  # Remove punctuation
+    text = SPACES_RE.sub(' ', text)      # Normalize spaces
+    return text.strip()
+
+class LabelIndex:
+    """Candidate labels of one statement, normalized once
+
+    Holds a normalized -> original dict for O(1) exact matches (the first
+    candidate wins, as in a linear scan) and the processed form of every
+    label that fuzzy scoring works on.
+    """
+
+    def __init__(self, candidates):
+        self.candidates = list(candidates)
+        self.normalized = [normalize_text(candidate) for candidate in self.candidates]
+        self.exact = {}
+        for candidate, normalized in zip(self.candidates, self.normalized):
+            self.exact.setdefault(normalized, candidate)
+        self.keys = [utils.full_process(candidate, force_ascii=True) for candidate in self.candidates]
+
+    def __len__(self):
+        return len(self.candidates)
+
+    def exact_match(self, target):
+        """Return the candidate equal to target after normalization, or None"""
+        return self.exact.get(normalize_text(target))
+
+def load_json(file_path, default):
+    """Load a JSON file, returning default if it is missing or unreadable"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return default
+
+def load_stored(cache_file):
+    """Contents of a cache file, or nothing when it was written under another SCORER_VERSION"""
+    stored = load_json(cache_file, {})
+    return stored if stored.get("version") == SCORER_VERSION else {}
+
+class LabelCache:
+    """Persistent map of (canonical label, raw label) -> fuzzy score
+
+    token_sort_ratio only sees the fully processed form of a label, so that
+    form is the key: a label seen once at any company is never scored again.
+    Accepted matches are also kept as a raw -> canonical map for review; they
+    were made against one statement's targets and are never applied elsewhere.
+    """
+
+    def __init__(self, cache_file=LABEL_CACHE_FILE, overrides_file=LABEL_OVERRIDES_FILE):
+        self.cache_file = cache_file
+        stored = load_stored(cache_file)
+        self.scores = stored.get("scores", {})
+        self.matches = stored.get("matches", {})
+        self.overrides = {normalize_text(raw): canonical
+                          for raw, canonical in load_json(overrides_file, {}).items()}
+        self.new_scores = {}
+        self.new_matches = {}
+        self.hits = 0
+        self.misses = 0
+
+    def score_matrix(self, targets, label_index):
+        """Score every target against every indexed label, one row per target
+
+        Pairs already in the cache or overrides are looked up; all the rest
+        are scored together in a single batched call. Scores of
+        MATCH_THRESHOLD and above are exact, lower ones may be upper bounds.
+        """
+        keys = label_index.keys
+
+        # Collect the (target, key) pairs never scored before
+        missing_targets = []
+        missing_keys = {}
+        for target in targets:
+            target_scores = self.scores.setdefault(target, {})
+            unseen = [key for key in keys if key not in target_scores]
+            if unseen:
+                missing_targets.append(target)
+                for key in unseen:
+                    missing_keys.setdefault(key, len(missing_keys))
+
+        scored = 0
+        if missing_targets:
+            batch = score_pairs(missing_targets, list(missing_keys))
+            for i, target in enumerate(missing_targets):
+                new_scores = self.new_scores.setdefault(target, {})
+                for key, j in missing_keys.items():
+                    if key not in self.scores[target]:
+                        self.scores[target][key] = new_scores[key] = batch[i][j]
+                        scored += 1
+
+        matrix = []
+        for target in targets:
+            target_scores = self.scores[target]
+            row = []
+            for key, override_key in zip(keys, label_index.normalized):
+                if override_key in self.overrides:
+                    row.append(100 if self.overrides[override_key] == target else 0)
+                else:
+                    row.append(target_scores[key])
+            matrix.append(row)
+        self.misses += scored
+        self.hits += len(targets) * len(set(keys)) - scored
+
+        return matrix
+
+    def override_matches(self, label_index):
+        """{canonical: first indexed label overridden to it}"""
+        overridden = {}
+        for candidate, normalized in zip(label_index.candidates, label_index.normalized):
+            if self.overrides.get(normalized):
+                overridden.setdefault(self.overrides[normalized], candidate)
+        return overridden
+
+    def record_match(self, target, candidate):
+        """Remember an accepted fuzzy match so it shows up in the review map"""
+        if self.matches.get(candidate) != target:
+            self.matches[candidate] = target
+            self.new_matches[candidate] = target
+
+    def canonical(self, label):
+        """Canonical name of a raw label: an override, else the label itself with spaces collapsed"""
+        override = self.overrides.get(normalize_text(label))
+        if override:
+            return override
+        return SPACES_RE.sub(' ', label).strip()
+
+    def take_updates(self):
+        """Return and clear what was learned since the last call (for pool workers)"""
+        updates = {"scores": self.new_scores, "matches": self.new_matches,
+                   "hits": self.hits, "misses": self.misses}
+        self.new_scores, self.new_matches = {}, {}
+        self.hits, self.misses = 0, 0
+        return updates
+
+    def merge_updates(self, updates):
+        """Fold updates learned in another process into this cache"""
+        for target, scores in updates["scores"].items():
+            self.scores.setdefault(target, {}).update(scores)
+            self.new_scores.setdefault(target, {}).update(scores)
+        self.matches.update(updates["matches"])
+        self.new_matches.update(updates["matches"])
+        self.hits += updates["hits"]
+        self.misses += updates["misses"]
+
+    def stats(self):
+        """Hit/miss counts for this run"""
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups else 0.0
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(hit_rate, 4),
+                "known_labels": sum(len(s) for s in self.scores.values())}
+
+    def save(self):
+        """Merge new entries into the file on disk and replace it atomically"""
+        if not self.new_scores and not self.new_matches:
+            return
+        stored = load_stored(self.cache_file)
+        scores = stored.get("scores", {})
+        for target, new in self.new_scores.items():
+            scores.setdefault(target, {}).update(new)
+        matches = stored.get("matches", {})
+        matches.update(self.new_matches)
+
+        tmp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({"version": SCORER_VERSION, "scores": scores, "matches": matches},
+                      f, indent=1, sort_keys=True)
+        os.replace(tmp_file, self.cache_file)
+        self.new_scores, self.new_matches = {}, {}
+
+_label_cache = None
+
+def get_label_cache():
+    """Return the process-wide label cache, loading it on first use"""
+    global _label_cache
+    if _label_cache is None:
+        _label_cache = LabelCache()
+    return _label_cache
+
+def use_label_cache(cache_file):
+    """Make the process-wide label cache read and save cache_file instead of LABEL_CACHE_FILE"""
+    global _label_cache
+    _label_cache = LabelCache(cache_file)
+    return _label_cache
+
+def process_target(target):
+    """A target as process.extractOne hands it to the scorer: processed by default, then again by the scorer"""
+    return utils.full_process(utils.full_process(target), force_ascii=True)
+
+def reference_score(processed_target, key):
+    """fuzzywuzzy's token_sort_ratio of two processed labels, the score process.extractOne picks by"""
+    return fuzz.token_sort_ratio(processed_target, key, full_process=False)
+
+def score_pairs(targets, keys, floor=MATCH_THRESHOLD):
+    """token_sort_ratio of every target against every processed key, as ints
+
+    Every score that can reach floor is fuzzywuzzy's, so picks are those
+    of process.extractOne. When rapidfuzz is available its token_sort_ratio
+    runs first over all cores: its longest common subsequence is never
+    shorter than difflib's matching blocks, so its score bounds
+    fuzzywuzzy's from above and only pairs whose bound reaches floor are
+    rescored. The others keep the bound, which is below floor either way.
+    """
+    processed = [process_target(target) for target in targets]
+    if rf_process is None:
+        return [[reference_score(target, key) for key in keys] for target in processed]
+
+    bounds = rf_process.cdist(processed, keys, scorer=rf_fuzz.token_sort_ratio, workers=MATCH_WORKERS)
+    matrix = []
+    for target, row in zip(processed, bounds):
+        scores = []
+        for key, bound in zip(keys, row):
+            bound = int(round(float(bound)))
+            scores.append(reference_score(target, key) if bound >= floor or target == key else bound)
+        matrix.append(scores)
+    return matrix
+
+def find_best_matches(targets, candidates, threshold=MATCH_THRESHOLD):
+    """Find the best match for each target in one pass; returns {target: candidate or None}
+
+    candidates may be a plain list or a LabelIndex built once per statement.
+    """
+    if threshold < MATCH_THRESHOLD:
+        raise ValueError(f"threshold {threshold} is below MATCH_THRESHOLD ({MATCH_THRESHOLD}), "
+                         "where cached scores are only upper bounds")
+    label_index = candidates if isinstance(candidates, LabelIndex) else LabelIndex(candidates)
+    cache = get_label_cache()
+    overridden = cache.override_matches(label_index)
+    matches = {}
+
+    # Overrides come first, then an exact match (case insensitive) unless
+    # an override sends that label elsewhere
+    fuzzy_targets = []
+    for target in targets:
+        matches[target] = overridden.get(target)
+        if matches[target] is None and normalize_text(target) not in cache.overrides:
+            matches[target] = label_index.exact_match(target)
+        if matches[target] is None:
+            fuzzy_targets.append(target)
+
+    if not fuzzy_targets or not label_index:
+        return matches
+
+    # If no exact match, use fuzzy matching; the first best candidate wins,
+    # as with process.extractOne
+    for target, row in zip(fuzzy_targets, cache.score_matrix(fuzzy_targets, label_index)):
+        best = max(range(len(row)), key=row.__getitem__)
+        if row[best] >= threshold:
+            matches[target] = label_index.candidates[best]
+            cache.record_match(target, label_index.candidates[best])
+
+    return matches
+
+def find_best_match(target, candidates, threshold=MATCH_THRESHOLD):
+    """Find the best fuzzy match for a target string among candidates"""
+    return find_best_matches([target], candidates, threshold)[target]
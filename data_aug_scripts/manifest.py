@@ -0,0 +1,66 @@
+import hashlib
+import inspect
+import json
+import os
+
+# Kept next to the outputs it describes, one per company
+MANIFEST_NAME = ".manifest.json"
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules every extractor depends on; a change to any of them invalidates all outputs
+SHARED_SOURCES = ["statement_io.py", "statement_tree.py", "periods.py", "label_matching.py",
+                  "label_overrides.json", "plot_datasets.py"]
+
+_code_versions = {}
+
+def hash_file(file_path):
+    """sha1 of a file's contents, or None if it does not exist"""
+    digest = hashlib.sha1()
+    try:
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+def code_version(extract):
+    """Fingerprint of the code behind an extractor: its module plus the shared modules"""
+    module_file = inspect.getsourcefile(extract)
+    if module_file not in _code_versions:
+        digest = hashlib.sha1()
+        for source in [module_file] + [os.path.join(SCRIPT_DIR, name) for name in SHARED_SOURCES]:
+            digest.update((hash_file(source) or "").encode())
+        _code_versions[module_file] = digest.hexdigest()
+    return _code_versions[module_file]
+
+def file_fingerprint(file_path, previous=None):
+    """Size, mtime and sha1 of a source file; the hash is reused while size and mtime match"""
+    stat = os.stat(file_path)
+    if previous and previous["size"] == stat.st_size and previous["mtime"] == stat.st_mtime_ns:
+        return previous
+    return {"size": stat.st_size, "mtime": stat.st_mtime_ns, "sha1": hash_file(file_path)}
+
+def load_manifest(plots_dir):
+    """Load a company's manifest, or an empty one if it has none yet"""
+    try:
+        with open(os.path.join(plots_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_manifest(plots_dir, manifest):
+    """Write a company's manifest"""
+    os.makedirs(plots_dir, exist_ok=True)
+    with open(os.path.join(plots_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+def is_up_to_date(entry, output_file, version, inputs):
+    """Check an output exists and was built by this code from these exact inputs"""
+    if not entry or entry.get("generator") != version or not os.path.exists(output_file):
+        return False
+    recorded = entry.get("inputs", {})
+    if set(recorded) != set(inputs):
+        return False
+    return all(recorded[name]["sha1"] == fingerprint["sha1"] for name, fingerprint in inputs.items())
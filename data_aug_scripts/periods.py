@@ -0,0 +1,127 @@
+import calendar
+import os
+import re
+
+# (source file suffix, statement type, months each column covers unless a "N mths" row says otherwise)
+STATEMENT_TYPES = [
+    ('BS.csv', 'balance_sheet', 12),
+    ('-PL.csv', 'profit_loss', 12),
+    ('cash-flow.csv', 'cash_flow', 12),
+    ('ratios.csv', 'ratios', 12),
+    ('_quarterly_results.csv', 'quarterly_results', 3),
+    ('_half-yearly_results.csv', 'half_yearly_results', 6),
+    ('_nine-monthly_results.csv', 'nine_monthly_results', 9),
+    ('_annual_results.csv', 'annual_results', 12),
+    # Written by the pipeline into plots/: one column per quarter end
+    ('ttm_metrics.csv', 'trailing_metrics', 3),
+]
+
+MONTH_NUMBERS = {calendar.month_abbr[m].lower(): m for m in range(1, 13)}
+
+# "Mar 22", "Dec '22", "Mar 2022"
+PERIOD_RE = re.compile(r"^([A-Za-z]{3})[a-z]*\.?\s*'?\s*(\d{2}|\d{4})$")
+# "12 mths"
+MONTHS_RE = re.compile(r"^(\d+)\s*mths?$", re.IGNORECASE)
+
+def statement_type(filename):
+    """(statement type, default months) of a source file, or None if it is not a statement"""
+    for suffix, name, months in STATEMENT_TYPES:
+        if filename.endswith(suffix):
+            return name, months
+    return None
+
+def parse_period(header):
+    """(year, month) of a period header such as "Mar 22" or "Dec '22", or None for padding"""
+    match = PERIOD_RE.match(header.strip())
+    if match is None:
+        return None
+    month = MONTH_NUMBERS.get(match.group(1).lower())
+    if month is None:
+        return None
+    year = int(match.group(2))
+    if year < 100:
+        year += 2000
+    return year, month
+
+def period_key(year, month):
+    """Canonical period id: the year and month the period ends, e.g. "2022-03" """
+    return "%04d-%02d" % (year, month)
+
+def period_end(year, month):
+    """ISO date of the last day of the period"""
+    return "%04d-%02d-%02d" % (year, month, calendar.monthrange(year, month)[1])
+
+class PeriodIndex:
+    """The period columns of one statement, parsed once
+
+    columns are value-column positions (into Statement.values) of the real
+    periods in file order, with padding ("--", blank) dropped; keys, ends,
+    months and fiscal_years run parallel to them. Periods are keyed by the
+    month they end in, so a balance sheet at Mar 22 joins the Mar 22 P&L and
+    the Mar '22 quarter.
+    """
+
+    def __init__(self, statement, filename=""):
+        kind = statement_type(filename)
+        self.statement_type, default_months = kind if kind else (None, 12)
+        months_row = find_months_row(statement)
+
+        self.columns, self.labels, self.keys, self.ends, self.months, self.fiscal_years = [], [], [], [], [], []
+        for column, header in enumerate(statement.headers[1:]):
+            parsed = parse_period(header)
+            if parsed is None:
+                continue
+            year, month = parsed
+            self.columns.append(column)
+            self.labels.append(header.strip())
+            self.keys.append(period_key(year, month))
+            self.ends.append(period_end(year, month))
+            self.months.append(months_row.get(column, default_months))
+            # Fiscal years are named by the year they end in (FY22 ends Mar 22)
+            self.fiscal_years.append(year)
+
+        self.position = {key: i for i, key in enumerate(self.keys)}
+
+    def __len__(self):
+        return len(self.columns)
+
+    def chronological(self):
+        """Positions into columns/keys ordered oldest first"""
+        return sorted(range(len(self.keys)), key=self.keys.__getitem__)
+
+    def align(self, keys):
+        """Value-column position for each canonical key, -1 where this statement lacks it"""
+        return [self.columns[self.position[key]] if key in self.position else -1 for key in keys]
+
+def find_months_row(statement):
+    """Months per value column from a "12 mths" row, if the statement has one"""
+    for row in statement.rows[:3]:
+        if row and row[0].strip() in ("", "--"):
+            months = {}
+            for column, cell in enumerate(row[1:]):
+                match = MONTHS_RE.match(cell.strip())
+                if match:
+                    months[column] = int(match.group(1))
+            if months:
+                return months
+    return {}
+
+def extract_period_axis(*statements):
+    """Long table of every period column of a company's statements, grouped by period length
+
+    One row per (statement, column): the canonical period, its end date,
+    months covered and fiscal year, oldest first, so consumers join and
+    order statements on "period" instead of parsing headers.
+    """
+    records = []
+    for statement in statements:
+        index = statement.period_index
+        name = os.path.basename(statement.path or "")
+        for i in index.chronological():
+            records.append((index.months[i], index.keys[i], name, index.columns[i] + 1, index.labels[i],
+                            index.ends[i], index.fiscal_years[i]))
+    if not records:
+        return None
+
+    headers = ["months", "period", "statement", "column", "header", "period_end", "fiscal_year"]
+    return headers, [list(record) for record in sorted(records)]
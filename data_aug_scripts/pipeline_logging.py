@@ -0,0 +1,76 @@
+import copy
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import pickle
+import sys
+
+# Attributes every LogRecord has; anything else on a record came in through extra=
+STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+TEXT_FORMAT = "%(asctime)s %(levelname)-7s %(message)s"
+
+# Log arguments of these types are known to pickle, so they are queued without a check
+PLAIN_ARG_TYPES = (str, int, float, bool, type(None))
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener
+
+    The stock handler merges args into the message before queueing, so
+    every worker paid for formatting records. Here the record keeps its
+    msg and args, which are only merged in the calling process when they
+    would not pickle; a traceback is rendered to text, since it cannot
+    cross the queue.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        args = record.args
+        if args:
+            values = args.values() if isinstance(args, dict) else args
+            if not all(isinstance(value, PLAIN_ARG_TYPES) for value in values):
+                try:
+                    pickle.dumps(args)
+                except Exception:
+                    record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the record's extra= fields as keys"""
+
+    def format(self, record):
+        entry = {
+            "time": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in STANDARD_ATTRS})
+        if record.exc_info or record.exc_text:
+            entry["exception"] = record.exc_text or self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def install_queue_handler(log_queue, verbose=False):
+    """Send every record in this process to log_queue; DEBUG (per-row detail) only when verbose"""
+    root = logging.getLogger()
+    root.handlers = [DeferredQueueHandler(log_queue)]
+    root.setLevel(logging.DEBUG if verbose else logging.INFO)
+
+def start_logging(verbose=False, json_lines=False, stream=None):
+    """Start a listener thread that does all the formatting and writing
+
+    Callers (and pool workers, via install_queue_handler) only enqueue
+    records, so no generator ever blocks on stderr. Returns (queue, listener);
+    stop the listener to flush.
+    """
+    log_queue = multiprocessing.Queue()
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonFormatter() if json_lines else logging.Formatter(TEXT_FORMAT))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    install_queue_handler(log_queue, verbose)
+    listener.start()
+    return log_queue, listener
@@ -1,235 +1,75 @@
-import os
-import pandas as pd
-import re
-from fuzzywuzzy import fuzz, process
+import logging
+from label_matching import find_best_matches
 
-def normalize_text(text):
-    """Normalize text for fuzzy matching by removing punctuation and standardizing spaces"""
-    if pd.isna(text):
-        return ""
-    # Convert to string, lowercase, remove punctuation, and normalize spaces
-    text = str(text).lower()
-    text = re.sub(r'[^\w\s]', '', text)  # Remove punctuation
-    text = re.sub(r'\s+', ' ', text)     # Normalize spaces
-    return text.strip()
+logger = logging.getLogger(__name__)
 
-def find_best_match(target, candidates, threshold=85):
-    """Find the best fuzzy match for a target string among candidates"""
-    # Try exact match first (case insensitive)
-    normalized_target = normalize_text(target)
-    for candidate in candidates:
-        if normalize_text(candidate) == normalized_target:
-            return candidate
-    
-    # If no exact match, use fuzzy matching
-    best_match, score = process.extractOne(target, candidates, scorer=fuzz.token_sort_ratio)
-    if score >= threshold:
-        return best_match
-    return None
-
-def find_revenue_label(available_labels):
+def find_revenue_label(matches):
     """Find Total Revenue, fall back to Total Income if not found"""
-    revenue_match = find_best_match("Total Revenue", available_labels)
+    revenue_match = matches["Total Revenue"]
     if revenue_match:
         return revenue_match, "Total Revenue"
     
-    income_match = find_best_match("Total Income", available_labels)
+    income_match = matches["Total Income"]
     if income_match:
         return income_match, "Total Income"
     
     return None, "Total Revenue"
 
-def process_pl_files(root_directory):
-    """Process all PL.csv files in the directory structure"""
+# Primary target labels we're looking for
+TARGET_LABELS = [
+    "Profit/Loss before Tax",
+    "Profit/Loss for the period"
+]
+
+def extract_revenue_profit(statement):
+    """Extract revenue (or income), PBT and net profit rows from a PL statement"""
+    if not statement.rows:
+        return None
     
-    # Primary target labels we're looking for
-    target_labels = [
-        "Profit/Loss before Tax",
-        "Profit/Loss for the period"
-    ]
+    # Remove the first header (top-left cell) but keep the rest
+    cleaned_headers = [''] + statement.headers[1:]
     
-    # Walk through all directories
-    for foldername, subfolders, filenames in os.walk(root_directory):
-        pl_files = [f for f in filenames if f.endswith('PL.csv')]
-        
-        if not pl_files:
-            continue
-            
-        print(f"Processing folder: {foldername}")
-        
-        for pl_file in pl_files:
-            file_path = os.path.join(foldername, pl_file)
-            print(f"  Processing file: {pl_file}")
-            
-            try:
-                # Read the entire CSV file to preserve original structure
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                
-                if len(lines) < 2:
-                    print(f"    Warning: File {pl_file} appears to be empty or malformed")
-                    continue
-                
-                # Extract headers (first line) and data
-                headers = lines[0].strip().split(',')
-                # Remove the first header (top-left cell) but keep the rest
-                cleaned_headers = [''] + headers[1:]
-                
-                # Extract all labels from first column
-                available_labels = []
-                data_rows = []
-                for line in lines[1:]:
-                    row = line.strip().split(',')
-                    if row and row[0]:  # if row is not empty and first column is not empty
-                        available_labels.append(row[0])
-                        data_rows.append(row)
-                
-                # Prepare output data
-                output_rows = []
-                found_labels = []
-                
-                # Find Revenue/Income first (with fallback)
-                revenue_label, display_revenue_label = find_revenue_label(available_labels)
-                if revenue_label:
-                    # Find the row with the matched label
-                    for row in data_rows:
-                        if row[0] == revenue_label:
-                            output_rows.append([display_revenue_label] + row[1:])
-                            found_labels.append(display_revenue_label)
-                            print(f"    Found: '{revenue_label}' for '{display_revenue_label}'")
-                            break
-                else:
-                    # Create a row with "NA" values
-                    na_row = ["Total Revenue"] + ["NA"] * (len(cleaned_headers) - 1)
-                    output_rows.append(na_row)
-                    found_labels.append("Total Revenue")
-                    print(f"    Warning: Could not find match for 'Total Revenue' or 'Total Income'")
-                
-                # Find the other target labels
-                for target_label in target_labels:
-                    matched_label = find_best_match(target_label, available_labels)
-                    
-                    if matched_label:
-                        # Find the row with the matched label
-                        for row in data_rows:
-                            if row[0] == matched_label:
-                                output_rows.append([target_label] + row[1:])
-                                found_labels.append(target_label)
-                                print(f"    Found: '{matched_label}' for '{target_label}'")
-                                break
-                    else:
-                        # Create a row with "NA" values
-                        na_row = [target_label] + ["NA"] * (len(cleaned_headers) - 1)
-                        output_rows.append(na_row)
-                        found_labels.append(target_label)
-                        print(f"    Warning: Could not find match for '{target_label}'")
-                
-                # Create plots directory if it doesn't exist
-                plots_dir = os.path.join(foldername, "plots")
-                os.makedirs(plots_dir, exist_ok=True)
-                
-                # Write output file
-                output_file = os.path.join(plots_dir, "02_plot_revPL.csv")
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    # Write headers (with empty first cell)
-                    f.write(','.join(cleaned_headers) + '\n')
-                    # Write data rows
-                    for row in output_rows:
-                        f.write(','.join(row) + '\n')
-                
-                print(f"    Saved extracted data to: {output_file}")
-                
-            except UnicodeDecodeError:
-                # Try with different encoding if UTF-8 fails
-                try:
-                    with open(file_path, 'r', encoding='latin-1') as f:
-                        lines = f.readlines()
-                    
-                    if len(lines) < 2:
-                        print(f"    Warning: File {pl_file} appears to be empty or malformed")
-                        continue
-                    
-                    # Extract headers (first line) and data
-                    headers = lines[0].strip().split(',')
-                    cleaned_headers = [''] + headers[1:]
-                    
-                    available_labels = []
-                    data_rows = []
-                    for line in lines[1:]:
-                        row = line.strip().split(',')
-                        if row and row[0]:
-                            available_labels.append(row[0])
-                            data_rows.append(row)
-                    
-                    output_rows = []
-                    found_labels = []
-                    
-                    # Find Revenue/Income
-                    revenue_label, display_revenue_label = find_revenue_label(available_labels)
-                    if revenue_label:
-                        for row in data_rows:
-                            if row[0] == revenue_label:
-                                output_rows.append([display_revenue_label] + row[1:])
-                                found_labels.append(display_revenue_label)
-                                print(f"    Found: '{revenue_label}' for '{display_revenue_label}'")
-                                break
-                    else:
-                        na_row = ["Total Revenue"] + ["NA"] * (len(cleaned_headers) - 1)
-                        output_rows.append(na_row)
-                        found_labels.append("Total Revenue")
-                        print(f"    Warning: Could not find match for 'Total Revenue' or 'Total Income'")
-                    
-                    # Find other labels
-                    for target_label in target_labels:
-                        matched_label = find_best_match(target_label, available_labels)
-                        
-                        if matched_label:
-                            for row in data_rows:
-                                if row[0] == matched_label:
-                                    output_rows.append([target_label] + row[1:])
-                                    found_labels.append(target_label)
-                                    print(f"    Found: '{matched_label}' for '{target_label}'")
-                                    break
-                        else:
-                            na_row = [target_label] + ["NA"] * (len(cleaned_headers) - 1)
-                            output_rows.append(na_row)
-                            found_labels.append(target_label)
-                            print(f"    Warning: Could not find match for '{target_label}'")
-                    
-                    plots_dir = os.path.join(foldername, "plots")
-                    os.makedirs(plots_dir, exist_ok=True)
-                    
-                    output_file = os.path.join(plots_dir, "02_plot_revPL.csv")
-                    with open(output_file, 'w', encoding='utf-8') as f:
-                        f.write(','.join(cleaned_headers) + '\n')
-                        for row in output_rows:
-                            f.write(','.join(row) + '\n')
-                    
-                    print(f"    Saved extracted data to: {output_file}")
-                    
-                except Exception as e:
-                    print(f"    Error processing {pl_file} with latin-1 encoding: {str(e)}")
-                
-            except Exception as e:
-                print(f"    Error processing {pl_file}: {str(e)}")
-        
-        print()  # Empty line for readability
-
-def main():
-    # Get the root directory (you can modify this path as needed)
-    root_directory = input("Enter the root directory path: ").strip()
+    # Prepare output data
+    output_rows = []
     
-    # Validate directory exists
-    if not os.path.exists(root_directory):
-        print(f"Error: Directory '{root_directory}' does not exist")
-        return
+    # Match revenue, income and the other targets in one batched call
+    matches = find_best_matches(["Total Revenue", "Total Income"] + TARGET_LABELS, statement.label_index)
     
-    print(f"Starting processing of directory: {root_directory}")
-    print("=" * 60)
+    # Find Revenue/Income first (with fallback)
+    revenue_label, display_revenue_label = find_revenue_label(matches)
+    if revenue_label:
+        # Look up the row with the matched label
+        row = statement.find_row(revenue_label)
+        output_rows.append([display_revenue_label] + row[1:])
+        logger.debug("Found: '%s' for '%s'", revenue_label, display_revenue_label)
+    else:
+        # Create a row with "NA" values
+        na_row = ["Total Revenue"] + ["NA"] * (len(cleaned_headers) - 1)
+        output_rows.append(na_row)
+        logger.debug("Could not find match for 'Total Revenue' or 'Total Income'")
     
-    process_pl_files(root_directory)
+    # Find the other target labels
+    for target_label in TARGET_LABELS:
+        matched_label = matches[target_label]
+        
+        if matched_label:
+            # Look up the row with the matched label
+            row = statement.find_row(matched_label)
+            output_rows.append([target_label] + row[1:])
+            logger.debug("Found: '%s' for '%s'", matched_label, target_label)
+        else:
+            # Create a row with "NA" values
+            na_row = [target_label] + ["NA"] * (len(cleaned_headers) - 1)
+            output_rows.append(na_row)
+            logger.debug("Could not find match for '%s'", target_label)
     
-    print("Processing complete!")
+    return cleaned_headers, output_rows
+
+def main():
+    # The pipeline walks the tree, so this script gets the same batch options
+    # (root, --companies, --workers, --dry-run, --summary) and manifests
+    from aug_pipeline import main as run_batch
+    run_batch(outputs=["02_plot_revPL.csv"], description="Process all PL.csv files in the directory structure")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
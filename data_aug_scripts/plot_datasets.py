@@ -0,0 +1,89 @@
+import json
+import os
+import numpy as np
+from periods import parse_period
+from statement_io import parse_values
+
+# Plots whose small series are folded into "Other", as the dashboard's area charts do
+BUCKETED_PLOTS = {"03_plot_expenses.csv", "04_plot_cashflow.csv"}
+# Share of the summed absolute values below which a series goes into "Other"
+OTHER_THRESHOLD_PERCENT = 5
+OTHER_LABEL = "Other"
+
+def dataset_name(output_name):
+    """Name of the ready-to-render dataset written next to a plot CSV"""
+    return os.path.splitext(output_name)[0] + ".json"
+
+def period_columns(headers, values):
+    """Value-column positions holding any data, ordered oldest first
+
+    Columns headed "--" or with nothing but "--"/"NA"/blank are dropped.
+    Parsable period headers are sorted by date; otherwise the scraper's
+    newest-first order is reversed.
+    """
+    has_data = ~np.isnan(values).all(axis=0) if len(values) else np.zeros(values.shape[1], dtype=bool)
+    columns = [c for c, header in enumerate(headers[1:]) if header.strip() != "--" and has_data[c]]
+    parsed = [parse_period(headers[c + 1]) for c in columns]
+    if all(parsed):
+        return [c for _, c in sorted(zip(parsed, columns))]
+    return list(reversed(columns))
+
+def bucket_small_series(keys, records, threshold=OTHER_THRESHOLD_PERCENT):
+    """Fold series under threshold% of the total absolute value into one "Other" series
+
+    Same rule as filterSmallCategories in DashboardPlots.js: nothing changes
+    when every series is significant or none is, and a period whose folded
+    series sum to zero gets no "Other" value. When they sum to zero in every
+    period they are dropped without adding an "Other" series at all.
+    """
+    totals = {key: sum(abs(r[key]) for r in records if r[key] is not None) for key in keys}
+    overall = sum(totals.values())
+    if not overall:
+        return keys, records
+    significant = [key for key in keys if totals[key] / overall * 100 >= threshold]
+    small = [key for key in keys if key not in significant]
+    if not small or not significant:
+        return keys, records
+
+    others = [sum(record.pop(key) or 0.0 for key in small) for record in records]
+    if not any(others):
+        return significant, records
+    for record, other in zip(records, others):
+        record[OTHER_LABEL] = round(other, 2) if other else None
+    return significant + [OTHER_LABEL], records
+
+def shape_plot_dataset(output_name, headers, rows, template=None):
+    """Dashboard payload for one plot: a record per period with a number (or null) per series
+
+    template names the industry template the plot was extracted with, so the
+    dashboard draws its series instead of the default plot's.
+    """
+    values = parse_values(rows, len(headers) - 1)
+    columns = period_columns(headers, values)
+
+    keys, series = [], {}
+    for row, cells in enumerate(rows):
+        label = cells[0] if cells else ""
+        if not label or label in series:
+            continue
+        keys.append(label)
+        series[label] = values[row]
+
+    records = []
+    for c in columns:
+        record = {"period": headers[c + 1].strip()}
+        for key in keys:
+            value = series[key][c]
+            record[key] = None if np.isnan(value) else float(value)
+        records.append(record)
+
+    bucketed = output_name in BUCKETED_PLOTS
+    if bucketed:
+        keys, records = bucket_small_series(keys, records)
+    return {"success": True, "keys": keys, "bucketed": bucketed, "template": template, "data": records}
+
+def write_plot_dataset(output_file, headers, rows, template=None):
+    """Write the dataset for a plot CSV beside it; the backend serves the file as is"""
+    dataset = shape_plot_dataset(os.path.basename(output_file), headers, rows, template)
+    with open(dataset_name(output_file), 'w', encoding='utf-8') as f:
+        json.dump(dataset, f, separators=(',', ':'))
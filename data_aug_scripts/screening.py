@@ -0,0 +1,136 @@
+import json
+import operator
+import os
+import numpy as np
+from label_matching import get_label_cache
+from periods import parse_period
+from statement_io import read_statement
+
+# Written under the root of the company tree
+SCREENING_DIR = "screening"
+TENSOR_FILE = "tensor.f32"
+AXES_FILE = "axes.json"
+
+# Plot outputs whose rows join the ratios statement in the tensor
+TENSOR_OUTPUTS = ["derived_metrics.csv"]
+
+OPERATORS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+def annual_series(statement, canonical=False):
+    """{metric: {fiscal year: value}} for the annual columns of a statement
+
+    Columns are keyed by fiscal year, so Dec and Mar year-ends line up; the
+    first row with a given label wins.
+    """
+    index = statement.period_index
+    years = [(column, year) for column, year, months in zip(index.columns, index.fiscal_years, index.months)
+             if months == 12]
+    if not years:
+        # Plot outputs carry the headers but not the statement type
+        years = [(column, parsed[0]) for column, parsed in
+                 ((c, parse_period(h)) for c, h in enumerate(statement.headers[1:])) if parsed]
+
+    label_cache = get_label_cache()
+    series = {}
+    for row, label in enumerate(statement.labels):
+        if not label:
+            continue
+        metric = label_cache.canonical(label) if canonical else label
+        values = {year: statement.values[row, column] for column, year in years
+                  if not np.isnan(statement.values[row, column])}
+        if values and metric not in series:
+            series[metric] = values
+    return series
+
+def company_series(foldername, filenames):
+    """Every annual ratio and derived metric of one company; scraped ratios win over derived ones"""
+    series = {}
+    for filename in sorted(filenames):
+        if filename.endswith('ratios.csv'):
+            series.update(annual_series(read_statement(os.path.join(foldername, filename)), canonical=True))
+    for output_name in TENSOR_OUTPUTS:
+        output_file = os.path.join(foldername, "plots", output_name)
+        if os.path.exists(output_file):
+            for metric, values in annual_series(read_statement(output_file)).items():
+                series.setdefault(metric, values)
+    return series
+
+def build_tensor(company_folders, output_dir):
+    """Write the company x metric x fiscal-year float32 tensor and its axes; returns the shape
+
+    Missing values are NaN. Files are written next to each other and swapped
+    in with os.replace, so a reader never maps a half-written tensor.
+    """
+    universe = {}
+    for foldername, filenames in company_folders:
+        series = company_series(foldername, filenames)
+        if series:
+            universe[os.path.basename(os.path.normpath(foldername))] = series
+
+    companies = sorted(universe)
+    metrics = sorted({metric for series in universe.values() for metric in series})
+    years = sorted({year for series in universe.values() for values in series.values() for year in values})
+    shape = (len(companies), len(metrics), len(years))
+    if not all(shape):
+        return shape
+
+    os.makedirs(output_dir, exist_ok=True)
+    tensor_path = os.path.join(output_dir, TENSOR_FILE)
+    axes_path = os.path.join(output_dir, AXES_FILE)
+
+    metric_position = {metric: i for i, metric in enumerate(metrics)}
+    year_position = {year: i for i, year in enumerate(years)}
+    cells = ([], [], [], [])
+    for c, company in enumerate(companies):
+        for metric, values in universe[company].items():
+            for year, value in values.items():
+                for axis, item in zip(cells, (c, metric_position[metric], year_position[year], value)):
+                    axis.append(item)
+
+    tensor = np.memmap(tensor_path + ".tmp", dtype=np.float32, mode='w+', shape=shape)
+    tensor[:] = np.nan
+    tensor[cells[0], cells[1], cells[2]] = cells[3]
+    tensor.flush()
+    del tensor
+
+    with open(axes_path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump({"shape": list(shape), "dtype": "float32", "companies": companies,
+                   "metrics": metrics, "fiscal_years": years}, f, indent=1)
+    os.replace(tensor_path + ".tmp", tensor_path)
+    os.replace(axes_path + ".tmp", axes_path)
+    return shape
+
+def open_tensor(output_dir):
+    """Map the tensor read-only (zero copy); returns (array, axes dict)"""
+    with open(os.path.join(output_dir, AXES_FILE), 'r', encoding='utf-8') as f:
+        axes = json.load(f)
+    tensor = np.memmap(os.path.join(output_dir, TENSOR_FILE), dtype=axes["dtype"], mode='r',
+                       shape=tuple(axes["shape"]))
+    return tensor, axes
+
+def screen(output_dir, conditions, years=1):
+    """Companies meeting every condition in `years` consecutive fiscal years
+
+    conditions are (metric, operator, threshold) tuples such as
+    ("Total Debt/Equity (X)", "<", 1); a missing value never passes, e.g.
+    screen(path, [("Total Debt/Equity (X)", "<", 1),
+                  ("Return on Capital Employed (%)", ">", 15)], years=3)
+    """
+    tensor, axes = open_tensor(output_dir)
+    metric_position = {metric: i for i, metric in enumerate(axes["metrics"])}
+
+    mask = np.ones((tensor.shape[0], tensor.shape[2]), dtype=bool)
+    for metric, op, threshold in conditions:
+        if metric not in metric_position:
+            raise KeyError(f"Unknown metric '{metric}'")
+        with np.errstate(invalid='ignore'):
+            mask &= OPERATORS[op](tensor[:, metric_position[metric], :], threshold)
+
+    if years > mask.shape[1]:
+        return []
+    windows = np.lib.stride_tricks.sliding_window_view(mask, years, axis=1)
+    # The year axis skips years no company reported, so a window only counts when its years are adjacent
+    fiscal_years = np.array(axes["fiscal_years"])
+    contiguous = fiscal_years[years - 1:] - fiscal_years[:len(fiscal_years) - years + 1] == years - 1
+    passing = (windows.all(axis=-1) & contiguous).any(axis=-1)
+    return [axes["companies"][i] for i in np.flatnonzero(passing)]
@@ -0,0 +1,177 @@
+import glob
+import json
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+from statement_io import read_statement
+
+# Written by the scraper next to Companies/
+SECTOR_FILE = "company-sector.json"
+CATEGORY_DIR = "Category-Companies"
+
+# Kept at the root of the company tree
+SECTOR_STATS_DB = "sector_stats.db"
+
+# Plot outputs whose ratios are aggregated
+RATIO_OUTPUTS = ["05_plot_margins.csv", "06_plot_leverage.csv"]
+
+QUANTILES = [("p10", 0.10), ("q1", 0.25), ("median", 0.50), ("q3", 0.75), ("p90", 0.90)]
+
+def folder_key(name):
+    """Company folder name the scraper uses for a company name"""
+    return name.replace(' ', '_').replace('.', '_')
+
+def find_sector_source(root_directory, sectors_dir=None):
+    """Directory holding company-sector.json or Category-Companies/, or None"""
+    candidates = [sectors_dir] if sectors_dir else [root_directory, os.path.dirname(os.path.abspath(root_directory))]
+    for candidate in candidates:
+        if os.path.exists(os.path.join(candidate, SECTOR_FILE)) or os.path.isdir(os.path.join(candidate, CATEGORY_DIR)):
+            return candidate
+    return None
+
+def sector_files(source_dir):
+    """The files load_sector_map reads from source_dir"""
+    return ([os.path.join(source_dir, SECTOR_FILE)] +
+            sorted(glob.glob(os.path.join(source_dir, CATEGORY_DIR, "*.json"))))
+
+def load_sector_map(source_dir):
+    """Map company folder name -> sector
+
+    The industry listed in Category-Companies/*.json is the fallback; the
+    sector recorded in company-sector.json wins when it is set.
+    """
+    sectors = {}
+    for category_file in sorted(glob.glob(os.path.join(source_dir, CATEGORY_DIR, "*.json"))):
+        try:
+            with open(category_file, 'r', encoding='utf-8') as f:
+                details = json.load(f).get("Company_details", [])
+        except (OSError, ValueError):
+            continue
+        for company in details:
+            if company.get("Company Name") and company.get("Industry"):
+                sectors[folder_key(company["Company Name"])] = company["Industry"].upper()
+
+    try:
+        with open(os.path.join(source_dir, SECTOR_FILE), 'r', encoding='utf-8') as f:
+            companies = json.load(f).get("companies", {})
+    except (OSError, ValueError):
+        companies = {}
+    for name, sector in companies.items():
+        if sector:
+            sectors[folder_key(name)] = sector.upper()
+
+    return sectors
+
+def ratio_records(foldername):
+    """(metric, fiscal year, value) arrays from a company's margin and leverage plots
+
+    Columns are keyed by their period_index fiscal year, so December and
+    March year-ends share a year's bucket; when a year-end change puts two
+    periods in one fiscal year, the later one is used.
+    """
+    metrics, fiscal_years, values = [], [], []
+    for output_name in RATIO_OUTPUTS:
+        output_file = os.path.join(foldername, "plots", output_name)
+        if not os.path.exists(output_file):
+            continue
+        statement = read_statement(output_file)
+        index = statement.period_index
+        latest = {index.fiscal_years[i]: index.columns[i] for i in index.chronological()}
+        if not latest or not statement.labels:
+            continue
+        years = sorted(latest, reverse=True)
+        metrics.append(np.repeat(np.array(statement.labels, dtype=object), len(years)))
+        fiscal_years.append(np.tile(np.array(years), len(statement.labels)))
+        values.append(statement.values[:, [latest[year] for year in years]].ravel())
+    if not metrics:
+        return None
+    return np.concatenate(metrics), np.concatenate(fiscal_years), np.concatenate(values)
+
+def compute_sector_stats(company_folders, sector_map):
+    """Per sector, metric and fiscal year: count, p10, quartiles, median and p90 of the ratios"""
+    frames = []
+    for foldername in company_folders:
+        sector = sector_map.get(folder_key(os.path.basename(os.path.normpath(foldername))))
+        if sector is None:
+            continue
+        records = ratio_records(foldername)
+        if records is not None:
+            metrics, fiscal_years, values = records
+            frames.append(pd.DataFrame({"sector": sector, "metric": metrics, "fiscal_year": fiscal_years,
+                                        "value": values}))
+    if not frames:
+        return pd.DataFrame(columns=["sector", "metric", "fiscal_year", "n"] + [name for name, _ in QUANTILES])
+
+    data = pd.concat(frames, ignore_index=True).dropna(subset=["value"])
+    grouped = data.groupby(["sector", "metric", "fiscal_year"])["value"]
+    stats = grouped.quantile([q for _, q in QUANTILES]).unstack()
+    stats.columns = [name for name, _ in QUANTILES]
+    stats = stats.round(4)
+    stats.insert(0, "n", grouped.size())
+    return stats.reset_index()
+
+def write_sector_stats(stats, company_sectors, db_path):
+    """Replace the sector tables in db_path in one transaction
+
+    sector_stats is recreated rather than emptied, so a database written
+    with an older key scheme (raw period headers) takes the current one.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS sector_stats")
+            conn.execute('''
+                CREATE TABLE sector_stats (
+                    sector TEXT NOT NULL,
+                    metric TEXT NOT NULL,
+                    fiscal_year INTEGER NOT NULL,
+                    n INTEGER NOT NULL,
+                    p10 REAL, q1 REAL, median REAL, q3 REAL, p90 REAL,
+                    PRIMARY KEY (sector, metric, fiscal_year)
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS company_sector (
+                    company TEXT PRIMARY KEY,
+                    sector TEXT
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS company_sector_by_sector ON company_sector (sector)")
+            conn.execute("DELETE FROM company_sector")
+            conn.executemany("INSERT INTO sector_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             stats[["sector", "metric", "fiscal_year", "n"] + [name for name, _ in QUANTILES]]
+                             .itertuples(index=False, name=None))
+            conn.executemany("INSERT INTO company_sector VALUES (?, ?)", sorted(company_sectors.items()))
+    finally:
+        conn.close()
+
+def build_sector_stats(company_folders, source_dir, db_path):
+    """Aggregate every company's ratios by sector into db_path; returns the number of rows"""
+    sector_map = load_sector_map(source_dir)
+    stats = compute_sector_stats(company_folders, sector_map)
+    companies = {os.path.basename(os.path.normpath(f)): sector_map.get(folder_key(os.path.basename(os.path.normpath(f))))
+                 for f in company_folders}
+    write_sector_stats(stats, companies, db_path)
+    return len(stats)
+
+def sector_distribution(db_path, company=None, sector=None, metric=None, fiscal_year=None):
+    """Look up sector distributions by company (its own sector), sector, metric and/or fiscal year"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        if company is not None:
+            row = conn.execute("SELECT sector FROM company_sector WHERE company = ?", (company,)).fetchone()
+            if row is None or row["sector"] is None:
+                return []
+            sector = row["sector"]
+
+        query = "SELECT * FROM sector_stats WHERE 1 = 1"
+        params = []
+        for column, value in (("sector", sector), ("metric", metric), ("fiscal_year", fiscal_year)):
+            if value is not None:
+                query += f" AND {column} = ?"
+                params.append(value)
+        return [dict(row) for row in conn.execute(query, params)]
+    finally:
+        conn.close()
@@ -0,0 +1,88 @@
+import csv
+import io
+import os
+import numpy as np
+import pandas as pd
+from label_matching import LabelIndex
+from periods import PeriodIndex
+from statement_tree import StatementTree
+
+class Statement:
+    """One scraped statement CSV, parsed once
+
+    headers is the first row, rows every row after it as text cells (quoted
+    values such as "6,145.30" stay whole), labels the first column of rows and
+    values a float64 matrix of the remaining cells with NaN for "--", blanks
+    and any other non-numeric text.
+    """
+
+    def __init__(self, headers, rows, encoding, path=None):
+        self.headers = headers
+        self.rows = rows
+        self.encoding = encoding
+        self.path = path
+        self.labels = [row[0] if row else "" for row in rows]
+        self.values = parse_values(rows, len(headers) - 1)
+        self._label_index = None
+        self._period_index = None
+        self._tree = None
+
+    @property
+    def label_index(self):
+        """LabelIndex over the non-empty labels, built once and shared by every extractor"""
+        if self._label_index is None:
+            self._label_index = LabelIndex([label for label in self.labels if label])
+        return self._label_index
+
+    @property
+    def period_index(self):
+        """PeriodIndex of the value columns, with the statement type taken from the file name"""
+        if self._period_index is None:
+            self._period_index = PeriodIndex(self, os.path.basename(self.path or ""))
+        return self._period_index
+
+    @property
+    def tree(self):
+        """StatementTree of the sections and label -> row lookups, built once"""
+        if self._tree is None:
+            self._tree = StatementTree(self)
+        return self._tree
+
+    def find_row(self, label):
+        """Cells of the first row labelled exactly label, or None"""
+        row = self.tree.row_of(label)
+        return None if row is None else self.rows[row]
+
+def decode_statement(data):
+    """Decode raw bytes as UTF-8, falling back to latin-1; returns (text, encoding)"""
+    try:
+        return data.decode('utf-8'), 'utf-8'
+    except UnicodeDecodeError:
+        return data.decode('latin-1'), 'latin-1'
+
+def parse_values(rows, width):
+    """Convert the value cells of rows to a float64 matrix in one vectorized pass"""
+    if not rows or width <= 0:
+        return np.empty((len(rows), max(width, 0)))
+    cells = [(row[1:] + [""] * width)[:width] for row in rows]
+    flat = pd.Series(np.array(cells, dtype=object).ravel())
+    numbers = pd.to_numeric(flat.str.replace(',', '', regex=False).str.strip(), errors='coerce')
+    return numbers.to_numpy(dtype=np.float64).reshape(len(rows), width)
+
+def read_statement(file_path):
+    """Read and parse a statement CSV with the C csv parser, detecting its encoding once"""
+    with open(file_path, 'rb') as f:
+        text, encoding = decode_statement(f.read())
+    records = list(csv.reader(io.StringIO(text, newline='')))
+    if not records:
+        return Statement([], [], encoding, file_path)
+    return Statement(records[0], records[1:], encoding, file_path)
+
+def write_plot_csv(output_file, headers, rows):
+    """Write an extracted plot table, creating the plots directory if needed"""
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8', newline='') as f:
+        # Quote cells such as "6,145.30" so the table reads back correctly
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(headers)
+        writer.writerows(rows)
@@ -0,0 +1,102 @@
+import numpy as np
+from label_matching import normalize_text
+
+class Section:
+    """A headed block of a statement, e.g. SHAREHOLDER'S FUNDS
+
+    row is the header's position in Statement.rows and end the last row the
+    section covers: its "Total <name>" row when it has one, otherwise the row
+    before the next header at the same or a higher level.
+    """
+
+    def __init__(self, name, row, depth, parent=None):
+        self.name = name
+        self.row = row
+        self.depth = depth
+        self.parent = parent
+        self.end = row
+        self.total = None
+        self.children = []
+
+    def __repr__(self):
+        return f"Section({self.name!r}, rows {self.row}-{self.end})"
+
+def is_section_header(label, values):
+    """Upper-case labels with no values ("EXPENSES", "NON-CURRENT ASSETS") head a section"""
+    label = label.strip()
+    return (any(c.isalpha() for c in label) and label == label.upper()
+            and (values.size == 0 or bool(np.isnan(values).all())))
+
+class StatementTree:
+    """Sections and line items of one statement, built in a single pass
+
+    A header directly followed by another header groups the sections under
+    it (EQUITIES AND LIABILITIES > SHAREHOLDER'S FUNDS, NON-CURRENT
+    LIABILITIES, ...) until the next such group; other headers are leaves.
+    Sections are looked up by normalized name and rows by exact label in
+    O(1); the first section or row with a given name wins.
+    """
+
+    def __init__(self, statement):
+        self.labels = statement.labels
+        self.row_index = {}
+        headers = []
+        for row, label in enumerate(statement.labels):
+            if not label:
+                continue
+            self.row_index.setdefault(label, row)
+            if statement.values.size and is_section_header(label, statement.values[row]):
+                headers.append(row)
+        self.header_rows = set(headers)
+
+        # Labelled rows in order, to tell whether a header is followed by another header
+        labelled = [row for row, label in enumerate(statement.labels) if label]
+        next_labelled = dict(zip(labelled, labelled[1:]))
+
+        self.sections = []
+        open_groups = []
+        previous = None
+        for row in headers:
+            opens_group = next_labelled.get(row) in self.header_rows
+            directly_nested = previous is not None and next_labelled.get(previous) == row
+            if opens_group and not directly_nested:
+                open_groups = []
+            parent = open_groups[-1] if open_groups else None
+            section = Section(statement.labels[row].strip(), row, len(open_groups), parent)
+            if parent is not None:
+                parent.children.append(section)
+            self.sections.append(section)
+            if opens_group:
+                open_groups.append(section)
+            previous = row
+
+        last_row = len(statement.labels) - 1
+        for i, section in enumerate(self.sections):
+            following = [s.row for s in self.sections[i + 1:] if s.depth <= section.depth]
+            section.end = following[0] - 1 if following else last_row
+            total_label = "total " + normalize_text(section.name)
+            for row in range(section.row + 1, section.end + 1):
+                if self.labels[row] and normalize_text(self.labels[row]) == total_label:
+                    section.total = section.end = row
+                    break
+
+        self.by_name = {}
+        for section in self.sections:
+            self.by_name.setdefault(normalize_text(section.name), section)
+
+    def roots(self):
+        """Top-level sections in file order"""
+        return [section for section in self.sections if section.parent is None]
+
+    def section(self, name):
+        """The section headed by name (compared after normalization), or None"""
+        return self.by_name.get(normalize_text(name))
+
+    def row_of(self, label):
+        """Position in Statement.rows of the first row labelled exactly label, or None"""
+        return self.row_index.get(label)
+
+    def line_items(self, section):
+        """Positions of the labelled non-header rows a section covers, in file order"""
+        return [row for row in range(section.row + 1, section.end + 1)
+                if self.labels[row] and row not in self.header_rows]
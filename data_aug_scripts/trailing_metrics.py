@@ -0,0 +1,113 @@
+import numpy as np
+from derived_metrics import format_value, yoy_growth
+from label_matching import find_best_matches
+from periods import parse_period
+
+TTM_METRICS_FILE = "ttm_metrics.csv"
+
+# Series name -> labels to look for in the quarterly and annual results, first match wins
+RESULT_ITEMS = {
+    "Revenue": ["Total Income From Operations", "Net Sales/Income from operations"],
+    "Profit Before Tax": ["P/L Before Tax"],
+    "Net Profit": ["Net Profit/(Loss) For the Period"],
+}
+
+def match_items(statement):
+    """Matched row of each RESULT_ITEMS series in a results statement, or None"""
+    matches = find_best_matches([label for labels in RESULT_ITEMS.values() for label in labels],
+                                statement.label_index)
+    rows = {}
+    for name, labels in RESULT_ITEMS.items():
+        label = next((matches[label] for label in labels if matches[label]), None)
+        rows[name] = None if label is None else statement.tree.row_of(label)
+    return rows
+
+def month_ordinal(header):
+    """Months since year 0 of a parsed period header, so quarters are 3 apart"""
+    year, month = parse_period(header)
+    return year * 12 + month - 1
+
+def trailing_series(quarters, annual_ends):
+    """Quarterly, QoQ, TTM and TTM-vs-annual series on a newest-first quarter grid
+
+    quarters holds one quarter per grid position (NaN where not reported)
+    and annual_ends maps grid positions to the annual figure ending there.
+    A year with exactly one unreported quarter gets that quarter from the
+    annual figure before the trailing sums are taken, and a year end the
+    quarters cannot cover at all falls back to the annual figure.
+    """
+    n = len(quarters)
+    reported = np.full(n, np.nan)
+    if n >= 4:
+        reported[:n - 3] = np.lib.stride_tricks.sliding_window_view(quarters, 4).sum(axis=-1)
+
+    filled = quarters.copy()
+    for position, annual in annual_ends.items():
+        window = filled[position:position + 4]
+        missing = np.isnan(window)
+        if len(window) == 4 and missing.sum() == 1:
+            window[missing] = annual - window[~missing].sum()
+
+    ttm = np.full(n, np.nan)
+    if n >= 4:
+        ttm[:n - 3] = np.lib.stride_tricks.sliding_window_view(filled, 4).sum(axis=-1)
+    gap = np.full(n, np.nan)
+    for position, annual in annual_ends.items():
+        if np.isnan(ttm[position]):
+            ttm[position] = annual
+        if annual:
+            gap[position] = 100 * (reported[position] - annual) / abs(annual)
+
+    return {
+        "": quarters,
+        " QoQ Growth (%)": 100 * yoy_growth(quarters),
+        " TTM": ttm,
+        # Rounded first so a match within rounding reads 0.00, not -0.00
+        " TTM vs Annual Results (%)": np.round(gap, 2) + 0.0,
+    }
+
+def extract_trailing_metrics(quarterly, annual):
+    """TTM and quarter-over-quarter revenue, PBT and net profit from the quarterly results
+
+    Columns are the quarters in the quarterly results, newest first; the
+    sums run on a regular quarter grid, so a quarter missing from the file
+    breaks the TTM instead of silently joining non-adjacent quarters.
+    """
+    index = quarterly.period_index
+    if not len(index) or not quarterly.rows:
+        return None
+
+    ordinals = [month_ordinal(label) for label in index.labels]
+    newest = max(ordinals)
+    # Three extra quarters so the oldest reported quarter still has a full window
+    n = (newest - min(ordinals)) // 3 + 4
+    positions = [(newest - o) // 3 if (newest - o) % 3 == 0 else None for o in ordinals]
+
+    annual_index = annual.period_index
+    annual_columns = []
+    for column, label, months in zip(annual_index.columns, annual_index.labels, annual_index.months):
+        offset = newest - month_ordinal(label)
+        if months == 12 and offset >= 0 and offset % 3 == 0 and offset // 3 < n:
+            annual_columns.append((offset // 3, column))
+
+    quarterly_rows, annual_rows = match_items(quarterly), match_items(annual)
+    rows = []
+    for name in RESULT_ITEMS:
+        quarters = np.full(n, np.nan)
+        if quarterly_rows[name] is not None:
+            for column, position in zip(index.columns, positions):
+                if position is not None:
+                    quarters[position] = quarterly.values[quarterly_rows[name], column]
+
+        annual_ends = {}
+        if annual_rows[name] is not None:
+            for position, column in annual_columns:
+                value = annual.values[annual_rows[name], column]
+                if not np.isnan(value):
+                    annual_ends[position] = value
+
+        for suffix, values in trailing_series(quarters, annual_ends).items():
+            rows.append([name + suffix] + [format_value(values[p]) if p is not None else "NA"
+                                           for p in positions])
+
+    return [''] + index.labels, rows
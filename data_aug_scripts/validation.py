@@ -0,0 +1,263 @@
+import logging
+import os
+import numpy as np
+import pandas as pd
+from financials_store import query_store, statement_records
+from periods import statement_type
+from statement_io import read_statement
+
+logger = logging.getLogger(__name__)
+
+# Written at the root of the company tree by the --validate pass
+VALIDATION_REPORT = "validation_report.csv"
+
+# One company's issues, kept in its plots/ and rebuilt only when its statements change
+COMPANY_ISSUES_FILE = "validation.csv"
+
+REPORT_COLUMNS = ["check", "company", "statement", "period", "line_item", "value", "expected", "detail"]
+# Read back as text; value and expected are the only numbers
+ISSUE_TEXT_COLUMNS = {column: str for column in REPORT_COLUMNS if column not in ("value", "expected")}
+
+# Scraped values carry two decimals; a tie-out passes within the larger of these
+ABSOLUTE_TOLERANCE = 0.1
+RELATIVE_TOLERANCE = 0.01
+
+# Cash-flow lines whose sum is the change in cash; the last two are often missing
+CASH_FLOW_COMPONENTS = [
+    "Net CashFlow From Operating Activities",
+    "Net Cash Used In Investing Activities",
+    "Net Cash Used From Financing Activities",
+    "Foreign Exchange Gains / Losses",
+    "Adjustments On Amalgamation Merger Demerger Others",
+]
+NET_CHANGE_IN_CASH = "Net Inc/Dec In Cash And Cash Equivalents"
+CASH_BEGIN = "Cash And Cash Equivalents Begin of Year"
+CASH_END = "Cash And Cash Equivalents End Of Year"
+
+# Series where a jump of UNIT_JUMP_FACTOR between adjacent periods means a unit change (lakh vs crore)
+UNIT_JUMP_ITEMS = [
+    ("balance_sheet", "Total Assets"),
+    ("balance_sheet", "Total Shareholders Funds"),
+    ("profit_loss", "Total Revenue"),
+]
+UNIT_JUMP_FACTOR = 50
+
+# Ratios further than this many standard deviations from the universe, per metric and period
+OUTLIER_Z = 3.0
+# Smallest number of companies a z-score is computed over
+OUTLIER_MIN_COMPANIES = 5
+
+DATA_COLUMNS = ["company", "statement", "line_item", "period", "months", "value"]
+
+def company_of(statement):
+    """Company folder name of a statement, or of a pipeline output in its plots/"""
+    folder = os.path.dirname(os.path.abspath(statement.path))
+    if os.path.basename(folder) == "plots":
+        folder = os.path.dirname(folder)
+    return os.path.basename(folder)
+
+def statements_frame(*statements):
+    """Already-parsed statements as one long company/statement/line_item/period/value frame"""
+    frames = []
+    for statement in statements:
+        kind = statement_type(os.path.basename(statement.path or ""))
+        if kind is None:
+            continue
+        records = statement_records(company_of(statement), kind[0], statement)
+        if records is not None:
+            frames.append(pd.DataFrame({key: records[key] for key in DATA_COLUMNS}))
+    if not frames:
+        return pd.DataFrame(columns=DATA_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+def wide(data, statement, line_items):
+    """One row per (company, period) and one column per line item; the first row with a label wins"""
+    subset = data[(data["statement"] == statement) & data["line_item"].isin(line_items)]
+    table = subset.pivot_table(index=["company", "period"], columns="line_item", values="value", aggfunc="first")
+    return table.reindex(columns=line_items)
+
+def issues(check, statement, index, line_item, value, expected, detail):
+    """Report rows for the (company, period) index entries that failed a check"""
+    return pd.DataFrame({
+        "check": check,
+        "company": index.get_level_values("company"),
+        "statement": statement,
+        "period": index.get_level_values("period"),
+        "line_item": line_item,
+        "value": np.asarray(value),
+        "expected": np.asarray(expected),
+        "detail": detail,
+    })
+
+def mismatched(value, expected):
+    """Where both sides are known and differ by more than the tolerance"""
+    tolerance = np.maximum(ABSOLUTE_TOLERANCE, RELATIVE_TOLERANCE * np.maximum(np.abs(value), np.abs(expected)))
+    return (np.abs(value - expected) > tolerance).fillna(False)
+
+def check_balance_sheet(data):
+    """Total Assets equals Total Capital And Liabilities"""
+    table = wide(data, "balance_sheet", ["Total Assets", "Total Capital And Liabilities"])
+    assets, liabilities = table["Total Assets"], table["Total Capital And Liabilities"]
+    bad = mismatched(assets, liabilities)
+    return issues("balance_sheet_tie", "balance_sheet", table.index[bad], "Total Assets",
+                  assets[bad], liabilities[bad], "assets differ from capital and liabilities")
+
+def check_cash_flow(data):
+    """Operating + investing + financing (+ FX, adjustments) and the cash balances tie to the change in cash"""
+    table = wide(data, "cash_flow", CASH_FLOW_COMPONENTS + [NET_CHANGE_IN_CASH, CASH_BEGIN, CASH_END])
+    net_change = table[NET_CHANGE_IN_CASH]
+    # The three activities must be there; the optional lines count as zero when absent
+    components = table[CASH_FLOW_COMPONENTS[:3]].sum(axis=1, min_count=3) + \
+        table[CASH_FLOW_COMPONENTS[3:]].fillna(0).sum(axis=1)
+    balance_change = table[CASH_END] - table[CASH_BEGIN]
+
+    bad_sum = mismatched(components, net_change)
+    bad_balance = mismatched(balance_change, net_change)
+    return pd.concat([
+        issues("cash_flow_tie", "cash_flow", table.index[bad_sum], NET_CHANGE_IN_CASH,
+               net_change[bad_sum], components[bad_sum], "activities do not sum to the change in cash"),
+        issues("cash_balance_tie", "cash_flow", table.index[bad_balance], NET_CHANGE_IN_CASH,
+               net_change[bad_balance], balance_change[bad_balance], "closing less opening cash differs"),
+    ], ignore_index=True)
+
+def check_empty_periods(data):
+    """Statement periods whose every value is zero, as scraped for a period the site had no data for"""
+    grouped = data.assign(zero=data["value"] == 0).groupby(["company", "statement", "period"])["zero"]
+    empty = grouped.all() & (grouped.size() > 1)
+    index = empty[empty].index
+    return pd.DataFrame({
+        "check": "empty_period",
+        "company": index.get_level_values("company"),
+        "statement": index.get_level_values("statement"),
+        "period": index.get_level_values("period"),
+        "line_item": "",
+        "value": 0.0,
+        "expected": np.nan,
+        "detail": "every value in the period is zero",
+    })
+
+def month_ordinals(periods):
+    """Canonical "YYYY-MM" periods as months since year 0"""
+    parts = periods.str.split("-", expand=True).astype(int)
+    return parts[0] * 12 + parts[1] - 1
+
+def check_missing_periods(data):
+    """Gaps in a statement's sequence of periods, e.g. Mar 22, Mar 21, Mar 19"""
+    periods = data[["company", "statement", "period", "months"]].drop_duplicates(["company", "statement", "period"])
+    periods = periods.assign(ordinal=month_ordinals(periods["period"])).sort_values(
+        ["company", "statement", "ordinal"])
+    step = periods.groupby(["company", "statement"])["ordinal"].diff()
+    # Quarters and halves repeat every 3 or 6 months; nine-month and annual figures once a year
+    cadence = np.where(12 % periods["months"] == 0, periods["months"], 12)
+    gaps = periods[step > cadence]
+    cadence = pd.Series(cadence, index=periods.index)[gaps.index]
+    return pd.DataFrame({
+        "check": "missing_period",
+        "company": gaps["company"].values,
+        "statement": gaps["statement"].values,
+        "period": gaps["period"].values,
+        "line_item": "",
+        "value": np.nan,
+        "expected": np.nan,
+        "detail": [f"{int(s) // int(c) - 1} period(s) missing before this one"
+                   for s, c in zip(step[gaps.index], cadence)],
+    })
+
+def check_unit_jumps(data):
+    """Adjacent periods of a key series differing by UNIT_JUMP_FACTOR or more"""
+    results = []
+    for statement, line_item in UNIT_JUMP_ITEMS:
+        series = data[(data["statement"] == statement) & (data["line_item"] == line_item)]
+        series = series.drop_duplicates(["company", "period"]).sort_values(["company", "period"])
+        previous = series.groupby("company")["value"].shift()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            factor = np.abs(series["value"]) / np.abs(previous)
+        bad = ((factor >= UNIT_JUMP_FACTOR) | (factor <= 1.0 / UNIT_JUMP_FACTOR)) & (previous != 0) & (series["value"] != 0)
+        flagged = series[bad.fillna(False)]
+        results.append(pd.DataFrame({
+            "check": "unit_jump",
+            "company": flagged["company"].values,
+            "statement": statement,
+            "period": flagged["period"].values,
+            "line_item": line_item,
+            "value": flagged["value"].values,
+            "expected": previous[flagged.index].values,
+            "detail": f"changed by a factor of {UNIT_JUMP_FACTOR} or more from the previous period",
+        }))
+    return pd.concat(results, ignore_index=True)
+
+def check_outliers(data):
+    """Ratios more than OUTLIER_Z standard deviations from the universe mean for that metric and period"""
+    ratios = data[data["statement"] == "ratios"].drop_duplicates(["company", "line_item", "period"])
+    grouped = ratios.groupby(["line_item", "period"])["value"]
+    mean, std, count = grouped.transform("mean"), grouped.transform("std"), grouped.transform("count")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (ratios["value"] - mean) / std
+    bad = (np.abs(z) > OUTLIER_Z) & (count >= OUTLIER_MIN_COMPANIES) & (std > 0)
+    flagged = ratios[bad]
+    return pd.DataFrame({
+        "check": "outlier",
+        "company": flagged["company"].values,
+        "statement": "ratios",
+        "period": flagged["period"].values,
+        "line_item": flagged["line_item"].values,
+        "value": flagged["value"].values,
+        "expected": mean[flagged.index].values,
+        "detail": [f"z-score {score:.1f} over {int(n)} companies" for score, n in
+                   zip(z[flagged.index], count[flagged.index])],
+    })
+
+# Checks that only look at one company; check_outliers needs the whole universe
+COMPANY_CHECKS = [check_balance_sheet, check_cash_flow, check_empty_periods, check_missing_periods,
+                  check_unit_jumps]
+
+def write_company_issues(data, company_folders):
+    """Run the per-company checks over the values of every changed company at once
+
+    data is the concatenated statements_frame of the company_folders; each
+    of them gets its plots/validation.csv, header only when nothing is flagged.
+    """
+    reports = [check(data) for check in COMPANY_CHECKS] if len(data) else []
+    report = pd.concat(reports, ignore_index=True) if reports else pd.DataFrame(columns=REPORT_COLUMNS)
+    report = report[REPORT_COLUMNS]
+    by_company = dict(iter(report.groupby("company", sort=False)))
+    for foldername in company_folders:
+        company = os.path.basename(os.path.normpath(foldername))
+        issues_file = os.path.join(foldername, "plots", COMPANY_ISSUES_FILE)
+        by_company.get(company, report.iloc[:0]).to_csv(issues_file, index=False, float_format="%.2f")
+    return len(report)
+
+def load_ratios(company_folders, store_dir=None, store_format='parquet'):
+    """Every company's ratios for the outlier check, from the columnar store when one is given"""
+    if store_dir is not None:
+        ratios = query_store(store_dir, "ratios", columns=["company", "line_item", "period", "months", "value"],
+                             store_format=store_format)
+        return ratios.assign(statement="ratios")[DATA_COLUMNS]
+    statements = [read_statement(os.path.join(foldername, filename)) for foldername, filenames in company_folders
+                  for filename in sorted(filenames) if filename.endswith('ratios.csv')]
+    return statements_frame(*statements)
+
+def validate(company_folders, report_path, store_dir=None, store_format='parquet'):
+    """Merge every company's plots/validation.csv with the universe-wide outlier check; returns {check: issues}
+
+    Per-company issues come from the files the pipeline keeps up to date, so
+    only the ratios are read here, from the store when store_dir is given.
+    """
+    reports = []
+    for foldername, _ in company_folders:
+        issues_file = os.path.join(foldername, "plots", COMPANY_ISSUES_FILE)
+        if os.path.exists(issues_file):
+            reports.append(pd.read_csv(issues_file, dtype=ISSUE_TEXT_COLUMNS, keep_default_na=False,
+                                       na_values={"value": [""], "expected": [""]}))
+    ratios = load_ratios(company_folders, store_dir, store_format)
+    if len(ratios):
+        reports.append(check_outliers(ratios))
+    reports = [report for report in reports if len(report)]
+    report = pd.concat(reports, ignore_index=True) if reports else pd.DataFrame(columns=REPORT_COLUMNS)
+    report = report[REPORT_COLUMNS].sort_values(["company", "check", "statement", "period", "line_item"])
+    report.to_csv(report_path, index=False, float_format="%.2f")
+
+    counts = report["check"].value_counts().to_dict()
+    for check, count in sorted(counts.items()):
+        logger.warning("Validation: %d %s issue(s)", count, check)
+    return counts
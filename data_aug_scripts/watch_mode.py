@@ -0,0 +1,136 @@
+import logging
+import os
+import threading
+import time
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+logger = logging.getLogger(__name__)
+
+CHANGE_EVENTS = {"created", "modified", "moved", "deleted", "closed"}
+
+# Seconds a company folder must stay unchanged before it is regenerated
+DEFAULT_SETTLE = 5.0
+# Seconds between scans when polling
+DEFAULT_POLL_INTERVAL = 2.0
+# Regenerate an incomplete statement set anyway once it has been quiet this long
+DEFAULT_INCOMPLETE_TIMEOUT = 300.0
+
+class CompanyDebouncer:
+    """Company folders with recent statement changes, and when each last changed
+
+    A folder is ready once it has been quiet for `settle` seconds and holds
+    every required statement, or has been quiet for `incomplete_timeout`.
+    """
+
+    def __init__(self, required_suffixes, settle=DEFAULT_SETTLE,
+                 incomplete_timeout=DEFAULT_INCOMPLETE_TIMEOUT):
+        self.required_suffixes = list(required_suffixes)
+        self.settle = settle
+        self.incomplete_timeout = incomplete_timeout
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def touch(self, foldername, when=None):
+        """Record a change in a company folder, restarting its quiet period"""
+        with self.lock:
+            self.pending[foldername] = time.monotonic() if when is None else when
+
+    def is_complete(self, filenames):
+        """Check a folder listing holds one statement for every required suffix"""
+        return all(any(f.endswith(suffix) for f in filenames) for suffix in self.required_suffixes)
+
+    def take_ready(self, now=None):
+        """Remove and return (folder, filenames) for every folder ready to regenerate"""
+        now = time.monotonic() if now is None else now
+        ready = []
+        with self.lock:
+            for foldername, changed in list(self.pending.items()):
+                quiet = now - changed
+                if quiet < self.settle:
+                    continue
+                try:
+                    filenames = os.listdir(foldername)
+                except FileNotFoundError:
+                    del self.pending[foldername]
+                    continue
+                if self.is_complete(filenames) or quiet >= self.incomplete_timeout:
+                    del self.pending[foldername]
+                    ready.append((foldername, filenames))
+        return ready
+
+class StatementEventHandler(FileSystemEventHandler):
+    """watchdog handler that marks the company folder of any changed statement"""
+
+    def __init__(self, debouncer, is_statement_file):
+        self.debouncer = debouncer
+        self.is_statement_file = is_statement_file
+
+    def on_any_event(self, event):
+        # Reading a statement raises opened/closed_no_write events; only writes count
+        if event.is_directory or event.event_type not in CHANGE_EVENTS:
+            return
+        for path in (event.src_path, getattr(event, "dest_path", "")):
+            if path and self.is_statement_file(os.path.basename(path)) \
+                    and os.path.basename(os.path.dirname(path)) != "plots":
+                self.debouncer.touch(os.path.dirname(path))
+
+def snapshot(root_directory, is_statement_file):
+    """(size, mtime) of every statement under root, keyed by path"""
+    state = {}
+    for foldername, subfolders, filenames in os.walk(root_directory):
+        subfolders[:] = [d for d in subfolders if d != "plots"]
+        for filename in filenames:
+            if is_statement_file(filename):
+                path = os.path.join(foldername, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                state[path] = (stat.st_size, stat.st_mtime_ns)
+    return state
+
+def watch(root_directory, is_statement_file, required_suffixes, regenerate,
+          settle=DEFAULT_SETTLE, poll_interval=DEFAULT_POLL_INTERVAL, use_polling=False,
+          incomplete_timeout=DEFAULT_INCOMPLETE_TIMEOUT):
+    """Call regenerate(folder, filenames) for each company folder whose statements change
+
+    Uses inotify (through watchdog) when installed, otherwise rescans the
+    tree every poll_interval seconds. Runs until interrupted.
+    """
+    debouncer = CompanyDebouncer(required_suffixes, settle, incomplete_timeout)
+    observer = None
+
+    if Observer is not None and not use_polling:
+        observer = Observer()
+        observer.schedule(StatementEventHandler(debouncer, is_statement_file), root_directory, recursive=True)
+        observer.start()
+        logger.info("Watching %s for new statements (inotify)", root_directory)
+    else:
+        logger.info("Watching %s for new statements (polling every %ss)", root_directory, poll_interval)
+
+    previous = None if observer else snapshot(root_directory, is_statement_file)
+    try:
+        while True:
+            time.sleep(min(poll_interval, settle))
+
+            if observer is None:
+                current = snapshot(root_directory, is_statement_file)
+                for path in set(current) | set(previous):
+                    if current.get(path) != previous.get(path):
+                        debouncer.touch(os.path.dirname(path))
+                previous = current
+
+            for foldername, filenames in debouncer.take_ready():
+                regenerate(foldername, filenames)
+    except KeyboardInterrupt:
+        logger.info("Stopped watching %s", root_directory)
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
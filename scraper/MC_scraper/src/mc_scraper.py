@@ -3,8 +3,11 @@ from bs4 import BeautifulSoup
 import copy
 import re
 import os
+import sys
 import json
-from multiprocessing import Process
+import math
+import functools
+from multiprocessing import Process, Pool
 
 # Libraries required to limit the time taken by a request
 import signal
@@ -15,6 +18,18 @@ base_dir	= "../output"
 company_dir	= base_dir+'/Companies'
 category_Company_dir = base_dir+'/Category-Companies'
 company_sector = {}
+emit_typed_sidecar = False
+
+# Period headers are parsed by the augmentation scripts' parser, so both read
+# them alike. Only --typed needs it, so it is imported on first use.
+aug_scripts_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "data_aug_scripts")
+
+# Seen-set shared with the src_batch shards, so no statement is fetched twice
+# in a crawl. Loaded on first use; without src_batch the crawl runs without it.
+src_batch_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src_batch")
+seen_urls = None
+
+unit_scales = {"cr": 1e7, "crore": 1e7, "lakh": 1e5, "lakhs": 1e5, "mn": 1e6, "million": 1e6}
 
 class TimeoutException(Exception): pass
 
@@ -75,6 +90,120 @@ def get_categories(aurl):
 
 
 
+# Converts a scraped cell to float64; "--", blanks and padding become NaN (null in the JSON)
+def parse_value(cell):
+	text = cell.replace(',','').replace('\xa0','').strip()
+	if text in ("","--","-"):
+		return math.nan
+	try:
+		return float(text)
+	except ValueError:
+		return math.nan
+
+
+# The augmentation scripts' periods module, imported from data_aug_scripts on first use
+def period_parser():
+	if aug_scripts_dir not in sys.path:
+		sys.path.insert(0, aug_scripts_dir)
+	import periods
+	return periods
+
+
+# Period-end date ("2022-03-31") of a period header ("Mar 22", "Dec '22"), None for padding
+def parse_period_end(cell):
+	periods = period_parser()
+	parsed = periods.parse_period(cell)
+	if parsed is None:
+		return None
+	return periods.period_end(*parsed)
+
+
+# The src_batch seen_urls module, or None when this checkout has no src_batch
+def seen_set():
+	global seen_urls
+	if seen_urls is None:
+		if src_batch_dir not in sys.path:
+			sys.path.insert(0, src_batch_dir)
+		try:
+			import seen_urls as module
+		except ImportError:
+			module = False
+		seen_urls = module
+	return seen_urls or None
+
+
+# seen_urls.fetch_once, applied at call time so the seen-set is only loaded when fetching
+def fetch_once(fetch):
+	@functools.wraps(fetch)
+	def fetch_claimed(aurl,*args):
+		seen = seen_set()
+		if seen is None:
+			return fetch(aurl,*args)
+		return seen.fetch_once(fetch)(aurl,*args)
+	return fetch_claimed
+
+
+# Pulls the unit out of a table title such as "Balance Sheet of X (in Rs. Cr.)"
+def parse_unit(title):
+	match = re.search(r"\(in ([^)]*)\)",title)
+	if match is None:
+		return None, None
+	unit = match.group(1).strip()
+	scale = None
+	for token in re.findall(r"[a-z]+",unit.lower()):
+		if token in unit_scales:
+			scale = unit_scales[token]
+	return unit, scale
+
+
+# Writes "<fname>.typed.json" next to the CSV: float64 values (null for "--"),
+# parsed period dates and the table unit. These are for readers outside the
+# augmentation scripts (notebooks, ad-hoc loaders) that want numbers without
+# parsing the site's text; data_aug_scripts reads the CSVs, which it needs
+# anyway for the raw cells it copies into its outputs.
+def write_typed_sidecar(table_rows,csv_path):
+	if len(table_rows) == 0:
+		return
+
+	periods = period_parser()
+	header = table_rows[0]
+	title = header[0] if len(header) > 0 else ""
+	columns = [c for c in range(1,len(header)) if periods.parse_period(header[c]) is not None]
+
+	period_months = None
+	labels = []
+	values = []
+	for row in table_rows[1:]:
+		if len(row) == 0:
+			continue
+		cells = [row[c] if c < len(row) else "" for c in columns]
+		if "mths" in " ".join(cells):
+			months = [periods.MONTHS_RE.match(cell.strip()) for cell in cells]
+			period_months = [int(m.group(1)) if m else None for m in months]
+			continue
+		labels.append(row[0].strip())
+		# JSON has no NaN; missing values are written as null
+		values.append([None if math.isnan(v) else v for v in map(parse_value,cells)])
+
+	unit, scale = parse_unit(title)
+	sidecar = {
+		"title": title.strip(),
+		"unit": unit,
+		"unit_scale": scale,
+		"periods": [header[c].strip() for c in columns],
+		"period_dates": [parse_period_end(header[c]) for c in columns],
+		"period_months": period_months,
+		"labels": labels,
+		"values": values
+	}
+
+	with open(os.path.splitext(csv_path)[0]+".typed.json",'w') as outfile:
+		json.dump(sidecar,outfile,allow_nan=False)
+
+	return
+
+
+@fetch_once
 def get_Data(aurl,aname,fname):
 
 	acc = ""
@@ -87,29 +216,31 @@ def get_Data(aurl,aname,fname):
 		soup	= get_soup(aurl)
 		og_table	= soup.find('div',{'class':'table-responsive financial-table'})
 	except AttributeError:
-		return
+		return False
 
 	if(og_table is None):
 		print("Error:Table Class")
-		return
+		return False
 
 	table	= og_table.find('table',{'class':'mctable1'})
 
 	if(table is None):
 		print("Error:Table")
-		return
+		return False
 
 	rows = table.find_all('tr')
 
 	if(rows is None):
 		print("Error:Rows")
-		return
+		return False
 
 	final_rows = ""
+	table_rows = []
 
 	for r in rows:
 		td = r.find_all('td')
 		row = [i.text for i in td]
+		table_rows.append(row)
 		#final_rows = final_rows+'['
 
 		lenrow = len(row)
@@ -129,7 +260,9 @@ def get_Data(aurl,aname,fname):
 	with open(company_dir+'/'+acc+'/'+fname,'w') as outfile:
 		outfile.write(final_rows)
 
-	
+	if emit_typed_sidecar:
+		write_typed_sidecar(table_rows,company_dir+'/'+acc+'/'+fname)
+
 
 	return
 
@@ -188,7 +321,8 @@ def get_sector(asoup):
 
 	return sector
 
-def get_Company_Data(aurl,aname):
+# Scrapes every statement of a company; returns (page found, sector)
+def fetch_Company_Data(aurl,aname):
 	soup	= get_soup(aurl)
 	temp 	= soup.find("div", {'class':'quick_links clearfix'})
 
@@ -197,7 +331,7 @@ def get_Company_Data(aurl,aname):
 
 	except AttributeError:
 		print("Data on '"+aname + "' doesn't exist anymore.")
-		return
+		return False, None
 
 	for i in range(0,len(links)):
 		field_text = links[i].get_text()
@@ -232,14 +366,26 @@ def get_Company_Data(aurl,aname):
 			get_results(required_link,aname,6)
 		
 
-	company_sector["companies"][aname] = get_sector(soup)
+	return True, get_sector(soup)
+
+
+def record_sector(aname,sector):
+	company_sector["companies"][aname] = sector
 
 	with open(base_dir+"/company-sector.json",'w') as outfile:
 		json.dump(company_sector,outfile)
 	return
 
 
-def get_list(aurl,category):
+def get_Company_Data(aurl,aname):
+	found, sector = fetch_Company_Data(aurl,aname)
+	if found:
+		record_sector(aname,sector)
+	return
+
+
+# Reads the company table of a category page without scraping the companies
+def parse_list(aurl):
 	details	= []
 	soup	= get_soup(aurl)
 	filters	= soup.find_all('div',{'class':'MT10'})
@@ -256,13 +402,25 @@ def get_list(aurl,category):
 		for i in range(0,len(headers)):
 			company[labels[i]] = fields[i].get_text()
 		company['link'] = baseurl + fields[0].find('a')['href']
-		get_Company_Data(company['link'],company['Company Name'])
 		details.append(company)
 
+	return details
+
+
+def write_category(category,details):
 	with open(category_Company_dir+'/'+category+'.json','w') as outfile:
 		json.dump({'Company_details':details},outfile)
 
 
+def get_list(aurl,category):
+	details = parse_list(aurl)
+
+	for company in details:
+		get_Company_Data(company['link'],company['Company Name'])
+
+	write_category(category,details)
+
+
 def get_sector_data(aurl):
 	categories = get_categories(aurl)
 
@@ -281,6 +439,47 @@ def get_sector_data(aurl):
 	company_list	= get_list(category_url,category)
 
 
+def fetch_category(item):
+	category, category_url = item
+	print("Accessing companies. Category : "+category)
+	return category, parse_list(category_url)
+
+
+def fetch_company(company):
+	return company['Company Name'], fetch_Company_Data(company['link'],company['Company Name'])
+
+
+# Crawls every category in categories.json in one pass: listings are fetched
+# concurrently, each Category-Companies/<category>.json is written as soon as
+# its listing arrives, and a company listed under several categories is
+# scraped only once
+def crawl_all_categories(p_limit=10):
+	with open(base_dir+"/categories.json",'r') as infile:
+		categories = json.load(infile)
+
+	seen		= set()
+	companies	= []
+	duplicates	= 0
+
+	with Pool(p_limit) as pool:
+		for category, details in pool.imap_unordered(fetch_category,categories.items()):
+			write_category(category,details)
+			print("Saved "+str(len(details))+" companies. Category : "+category)
+
+			for company in details:
+				if company['link'] in seen:
+					duplicates = duplicates+1
+					continue
+				seen.add(company['link'])
+				companies.append(company)
+
+		print("Scraping "+str(len(companies))+" companies ("+str(duplicates)+" listed in more than one category)")
+
+		for aname, (found, sector) in pool.imap_unordered(fetch_company,companies):
+			if found:
+				record_sector(aname,sector)
+
+
 def get_alpha_quotes(aurl):
 	soup = get_soup(aurl)
 
@@ -332,11 +531,26 @@ if __name__ == '__main__':
 
 	url 			= quote_list_url
 
+	# Pass --typed to also write a numeric "<file>.typed.json" next to every CSV (see write_typed_sidecar)
+	emit_typed_sidecar = "--typed" in sys.argv[1:]
+	if emit_typed_sidecar:
+		# Fail before crawling when data_aug_scripts is not beside the scraper
+		period_parser()
+
 	print("Initializing")
 	ckdir(base_dir)
 	ckdir(company_dir)
 	ckdir(category_Company_dir)
 
+	# A new crawl starts from an empty seen-set; --resume only fetches what earlier runs did not
+	if seen_set() is None:
+		if "--resume" in sys.argv[1:]:
+			print("Error: --resume needs src_batch/seen_urls.py")
+			sys.exit(1)
+		print("No src_batch/seen_urls.py, crawling without the seen-set")
+	elif "--resume" not in sys.argv[1:]:
+		seen_urls.reset()
+
 	try:
 		with open(base_dir+"/company-sector.json",'r') as infile:
 			company_sector = json.load(infile)
@@ -346,4 +560,7 @@ if __name__ == '__main__':
 	# print(company_sector)
 
 	# get_sector_data(url)
-	get_all_quotes_data(url)
\ No newline at end of file
+	if "--categories" in sys.argv[1:]:
+		crawl_all_categories()
+	else:
+		get_all_quotes_data(url)
\ No newline at end of file
@@ -10,6 +10,9 @@ from multiprocessing import Process
 import signal
 from contextlib import contextmanager
 
+# Shared seen-set so no two shards fetch the same company or statement
+import seen_urls
+
 baseurl		= "http://www.moneycontrol.com"
 base_dir	= "../output"
 company_dir	= base_dir+'/Companies'
@@ -75,6 +78,7 @@ def get_categories(aurl):
 
 
 
+@seen_urls.fetch_once
 def get_Data(aurl,aname,fname):
 
 	acc = ""
@@ -87,23 +91,23 @@ def get_Data(aurl,aname,fname):
 		soup	= get_soup(aurl)
 		og_table	= soup.find('div',{'class':'table-responsive financial-table'})
 	except AttributeError:
-		return
+		return False
 
 	if(og_table is None):
 		print("Error:Table Class")
-		return
+		return False
 
 	table	= og_table.find('table',{'class':'mctable1'})
 
 	if(table is None):
 		print("Error:Table")
-		return
+		return False
 
 	rows = table.find_all('tr')
 
 	if(rows is None):
 		print("Error:Rows")
-		return
+		return False
 
 	final_rows = ""
 
@@ -188,6 +192,7 @@ def get_sector(asoup):
 
 	return sector
 
+@seen_urls.fetch_once
 def get_Company_Data(aurl,aname):
 	soup	= get_soup(aurl)
 	temp 	= soup.find("div", {'class':'quick_links clearfix'})
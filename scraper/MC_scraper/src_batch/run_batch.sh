@@ -1,3 +1,4 @@
+python3 seen_urls.py reset
 time python3 mc_scraper1.py &
 time python3 mc_scraper1_2.py &
 time python3 mc_scraper1_3.py &
@@ -31,4 +32,5 @@ time python3 mc_scraper20.py &
 time python3 mc_scraper21.py &
 time python3 mc_scraper22.py &
 time python3 mc_scraper23.py &
-wait
\ No newline at end of file
+wait
+python3 seen_urls.py report
@@ -0,0 +1,109 @@
+import os
+import sys
+import sqlite3
+import functools
+
+# Seen-set shared by every mc_scraper shard. A URL is fetched only by the
+# shard that claims it first, so a company listed under several alphabets or
+# categories is scraped once per crawl. A claim is dropped again when the
+# fetch fails, so the next run (without a reset) retries only those URLs.
+#
+#	python3 seen_urls.py reset		start a new crawl
+#	python3 seen_urls.py report		fetched / avoided counts per shard
+
+db_path	= "../output/seen_urls.db"
+shard	= os.path.basename(sys.argv[0])
+
+conn	= None
+conn_pid = None
+
+
+def get_conn():
+	global conn
+	global conn_pid
+
+	# sqlite connections must not cross a fork
+	if conn is None or conn_pid != os.getpid():
+		# reset can run before any shard has created the output directory
+		os.makedirs(os.path.dirname(os.path.abspath(db_path)),exist_ok=True)
+		conn = sqlite3.connect(db_path,timeout=60,isolation_level=None)
+		conn.execute("PRAGMA journal_mode=WAL")
+		conn.execute('''
+			CREATE TABLE IF NOT EXISTS seen (
+				url TEXT PRIMARY KEY,
+				shard TEXT NOT NULL,
+				seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+			)
+		''')
+		conn.execute('''
+			CREATE TABLE IF NOT EXISTS avoided (
+				url TEXT NOT NULL,
+				shard TEXT NOT NULL,
+				avoided_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+			)
+		''')
+		conn_pid = os.getpid()
+	return conn
+
+
+# Returns True if the caller should fetch aurl, False if some shard already has
+def claim(aurl):
+	c = get_conn()
+	cur = c.execute("INSERT OR IGNORE INTO seen (url, shard) VALUES (?, ?)",(aurl,shard))
+	if cur.rowcount == 1:
+		return True
+
+	c.execute("INSERT INTO avoided (url, shard) VALUES (?, ?)",(aurl,shard))
+	return False
+
+
+# Drops this shard's claim on aurl so a later run fetches it again
+def release(aurl):
+	get_conn().execute("DELETE FROM seen WHERE url = ? AND shard = ?",(aurl,shard))
+
+
+# Decorator for a shard's fetch(aurl, ...): skips URLs another shard has
+# claimed, and keeps the claim only if fetch returns anything but False
+# without raising
+def fetch_once(fetch):
+	@functools.wraps(fetch)
+	def fetch_claimed(aurl,*args):
+		if not claim(aurl):
+			return None
+		fetched = False
+		try:
+			result = fetch(aurl,*args)
+			fetched = result is not False
+		finally:
+			if not fetched:
+				release(aurl)
+		return result
+	return fetch_claimed
+
+
+def reset():
+	c = get_conn()
+	c.execute("DELETE FROM seen")
+	c.execute("DELETE FROM avoided")
+
+
+def report():
+	c = get_conn()
+	fetched = dict(c.execute("SELECT shard, COUNT(*) FROM seen GROUP BY shard").fetchall())
+	avoided = dict(c.execute("SELECT shard, COUNT(*) FROM avoided GROUP BY shard").fetchall())
+
+	print("%-24s %10s %10s" % ("shard","fetched","avoided"))
+	for name in sorted(set(fetched) | set(avoided)):
+		print("%-24s %10d %10d" % (name,fetched.get(name,0),avoided.get(name,0)))
+	print("%-24s %10d %10d" % ("total",sum(fetched.values()),sum(avoided.values())))
+
+
+if __name__ == '__main__':
+	command = sys.argv[1] if len(sys.argv) > 1 else "report"
+
+	if command == "reset":
+		reset()
+	elif command == "report":
+		report()
+	else:
+		print("Usage: python3 seen_urls.py [reset|report]")